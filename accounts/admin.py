@@ -20,4 +20,5 @@ class StudentProgressAdmin(admin.ModelAdmin):
     list_display = ['student', 'ecosystem', 'session', 'visited_at', 'time_spent_minutes', 'completed']
     list_filter = ['completed', 'visited_at']
     search_fields = ['student__username', 'ecosystem__name', 'session__title']
+    list_select_related = ['student', 'ecosystem', 'session__teacher']
     readonly_fields = ['visited_at']
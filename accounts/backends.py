@@ -0,0 +1,122 @@
+"""Authentication backend that loads ``request.user`` from the cache.
+
+``AuthenticationMiddleware`` loads the user of every authenticated request by
+primary key. ``CachedModelBackend`` keeps a snapshot of the columns every page
+needs (``SNAPSHOT_FIELDS``: the name, the role and the auth flags) under
+``auth:user:<SNAPSHOT_VERSION>:<secret digest>:<pk>`` and rebuilds the user
+from it with the other columns deferred, so they are only read from the
+database by the pages that show them.
+
+Session verification needs ``get_session_auth_hash()``, which is an HMAC of the
+password hash; the snapshot stores that HMAC rather than the password hash
+itself; the key carries a digest of ``SECRET_KEY``, so rotating the key, which
+changes that HMAC, also retires the snapshots. Saving a user rewrites their
+snapshot (``accounts.signals``); a miss only ever *adds* one, read from the
+primary database rather than a replica that may not have the last save yet, so
+a request that read the row before a save cannot put the old values back.
+``QuerySet.update()`` bypasses the signals: call ``forget_user()`` after
+updating users that way. Snapshots still expire after
+``AUTH_USER_CACHE_TIMEOUT`` seconds, which bounds how long any that was missed
+stays in use.
+
+Every worker must see the same snapshots, or a save in one would leave the old
+role and password hash in use in the others: the system check ``accounts.E001``
+rejects this backend with a process-local cache.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core import checks
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import salted_hmac
+from .progress import cache_is_shared
+
+UserModel = get_user_model()
+
+# Bump the version whenever the fields change, so old snapshots are ignored.
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FIELDS = ('id', 'username', 'first_name', 'last_name', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _key(user_id):
+    secret = salted_hmac('accounts.backends', 'snapshot').hexdigest()[:16]
+    return f'auth:user:{SNAPSHOT_VERSION}:{secret}:{user_id}'
+
+
+def _timeout():
+    return getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300)
+
+
+def snapshot(user):
+    """The cached form of ``user``, or None if a field it needs is deferred"""
+    deferred = user.get_deferred_fields()
+    if deferred.intersection(SNAPSHOT_FIELDS) or 'password' in deferred:
+        return None
+    return {
+        'fields': {name: getattr(user, name) for name in SNAPSHOT_FIELDS},
+        'session_auth_hash': user.get_session_auth_hash(),
+    }
+
+
+def from_snapshot(data):
+    fields = data['fields']
+    names = [f.attname for f in UserModel._meta.concrete_fields if f.attname in fields]
+    user = UserModel.from_db(DEFAULT_DB_ALIAS, names, [fields[name] for name in names])
+    user._session_auth_hash = data['session_auth_hash']
+    return user
+
+
+def remember_user(user):
+    data = snapshot(user)
+    if data is None:
+        forget_user(user.pk)
+    else:
+        cache.set(_key(user.pk), data, _timeout())
+
+
+def forget_user(user_id):
+    cache.delete(_key(user_id))
+
+
+def _primary_users():
+    return UserModel._default_manager.db_manager(DEFAULT_DB_ALIAS)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        data = cache.get(_key(user_id))
+        if data is None:
+            try:
+                user = _primary_users().get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            cache.add(_key(user.pk), snapshot(user), _timeout())
+        else:
+            user = from_snapshot(data)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        data = await cache.aget(_key(user_id))
+        if data is None:
+            try:
+                user = await _primary_users().aget(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            await cache.aadd(_key(user.pk), snapshot(user), _timeout())
+        else:
+            user = from_snapshot(data)
+        return user if self.user_can_authenticate(user) else None
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    backend = f'{__name__}.{CachedModelBackend.__name__}'
+    if backend in settings.AUTHENTICATION_BACKENDS and not cache_is_shared():
+        return [checks.Error(
+            f'{backend} needs a cache shared by every worker process.',
+            hint='Configure a shared default cache (e.g. set VIRTUAL_ZOO_CACHE_DIR) '
+                 'or use django.contrib.auth.backends.ModelBackend.',
+            id='accounts.E001',
+        )]
+    return []
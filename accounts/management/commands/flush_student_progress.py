@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from accounts.progress import progress_buffer, request_flush
+
+
+class Command(BaseCommand):
+    help = 'Flushes buffered student progress views to the database'
+
+    def handle(self, *args, **options):
+        requested = request_flush()
+        touched = progress_buffer.flush()
+        if not requested:
+            self.stderr.write(self.style.WARNING(
+                'The cache is local to each process, so the web workers cannot be reached: only this '
+                'process was flushed. Configure a shared cache (e.g. VIRTUAL_ZOO_CACHE_DIR) to flush them.'
+            ))
+            self.stdout.write(self.style.SUCCESS(f'Flushed {touched} pending progress rows from this process.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Flush requested from all workers; flushed {touched} pending progress rows from this process.'
+        ))
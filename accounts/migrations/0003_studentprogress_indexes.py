@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_studentprogress'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='studentprogress',
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name='studentprogress',
+            index=models.Index(fields=['student', 'visited_at'], name='progress_student_visited_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentprogress',
+            constraint=models.UniqueConstraint(condition=models.Q(('ecosystem__isnull', False)), fields=('student', 'ecosystem'), name='progress_unique_student_ecosystem'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentprogress',
+            constraint=models.UniqueConstraint(condition=models.Q(('session__isnull', False)), fields=('student', 'session'), name='progress_unique_student_session'),
+        ),
+    ]
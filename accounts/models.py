@@ -19,6 +19,12 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
     
+    def get_session_auth_hash(self):
+        # A user restored from its cached snapshot carries the hash, not the password (see accounts.backends).
+        if 'password' not in self.__dict__ and hasattr(self, '_session_auth_hash'):
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+    
     def is_admin_user(self):
         return self.role == 'admin' or self.is_superuser
     
@@ -29,6 +35,15 @@ class User(AbstractUser):
         return self.role == 'student'
 
 
+class StudentProgressQuerySet(models.QuerySet):
+    def for_dashboard(self):
+        """Progress rows with the title of what was visited, for the student dashboard"""
+        return self.select_related('ecosystem', 'session').only(
+            'ecosystem', 'session', 'visited_at', 'time_spent_minutes', 'completed',
+            'ecosystem__name', 'session__title',
+        )
+
+
 class StudentProgress(models.Model):
     """Track student progress through ecosystems and sessions"""
     student = models.ForeignKey('accounts.User', on_delete=models.CASCADE, related_name='progress', limit_choices_to={'role': 'student'})
@@ -38,9 +53,26 @@ class StudentProgress(models.Model):
     time_spent_minutes = models.IntegerField(default=0, help_text="Time spent viewing in minutes")
     completed = models.BooleanField(default=False)
     
+    objects = StudentProgressQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-visited_at']
-        unique_together = [['student', 'ecosystem'], ['student', 'session']]
+        # A row tracks either an ecosystem or a session, so each unique index is
+        # partial and only holds the rows it applies to.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'ecosystem'], condition=models.Q(ecosystem__isnull=False),
+                name='progress_unique_student_ecosystem',
+            ),
+            models.UniqueConstraint(
+                fields=['student', 'session'], condition=models.Q(session__isnull=False),
+                name='progress_unique_student_session',
+            ),
+        ]
+        indexes = [
+            # student_dashboard: a student's progress, newest first
+            models.Index(fields=['student', 'visited_at'], name='progress_student_visited_idx'),
+        ]
     
     def __str__(self):
         if self.ecosystem:
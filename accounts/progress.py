@@ -0,0 +1,202 @@
+"""Write-behind buffer for StudentProgress view tracking.
+
+Detail views call ``record_view`` instead of writing to the database. Views
+are counted in memory per (student, ecosystem) or (student, session) pair and
+written out by ``flush`` in one bulk insert plus one ``F()`` update. A daemon
+thread flushes every ``STUDENT_PROGRESS_FLUSH_INTERVAL`` seconds and whenever
+``flush_student_progress`` bumps the flush request marker in the cache; the
+buffer is also flushed at interpreter exit.
+
+The marker only reaches the other workers through a cache they share (set
+``VIRTUAL_ZOO_CACHE_DIR``, or configure memcached or Redis). With the default
+per-process local-memory cache, ``flush_student_progress`` can only flush its
+own buffer and says so.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, When, IntegerField
+
+logger = logging.getLogger(__name__)
+
+FLUSH_REQUEST_KEY = 'student_progress:flush_requested'
+POLL_SECONDS = 1
+# Attempts at inserting first visits that lose a race with another flush
+INSERT_ATTEMPTS = 3
+# Cache backends whose entries other processes cannot see
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+class ProgressBuffer:
+    """Thread-safe accumulator of pending StudentProgress view counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, student_id, ecosystem_id=None, session_id=None):
+        key = (student_id, 'ecosystem' if ecosystem_id else 'session', ecosystem_id or session_id)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+        self._ensure_flusher()
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def flush(self):
+        """Write all pending views to the database; returns the number of rows touched"""
+        pending = self.drain()
+        if not pending:
+            return 0
+        try:
+            touched = 0
+            with transaction.atomic():
+                for kind in ('ecosystem', 'session'):
+                    counts = {(student, target): views for (student, k, target), views in pending.items() if k == kind}
+                    if counts:
+                        touched += _apply(kind, counts)
+            return touched
+        except Exception:
+            # Put the views back so the next flush retries them.
+            with self._lock:
+                for key, views in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + views
+            raise
+
+    def _ensure_flusher(self):
+        interval = getattr(settings, 'STUDENT_PROGRESS_FLUSH_INTERVAL', 30)
+        if not interval or (self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(interval,), name='student-progress-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self, interval):
+        last_flush = time.monotonic()
+        last_request = cache.get(FLUSH_REQUEST_KEY)
+        while True:
+            time.sleep(POLL_SECONDS)
+            request = cache.get(FLUSH_REQUEST_KEY)
+            if request == last_request and time.monotonic() - last_flush < interval:
+                continue
+            last_request, last_flush = request, time.monotonic()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Could not flush student progress')
+            finally:
+                connection.close()
+
+
+def _apply(kind, counts):
+    """Insert first visits and add the remaining views to existing rows"""
+    for attempt in range(INSERT_ATTEMPTS):
+        existing = _existing(kind, counts)
+        first_visits = {key: views for key, views in counts.items() if key not in existing}
+        if not first_visits:
+            break
+        try:
+            # A savepoint, so that a lost race leaves the outer transaction usable
+            with transaction.atomic():
+                _insert(kind, first_visits)
+            break
+        except IntegrityError:
+            # Another worker inserted some of the rows since they were read; read
+            # them again so that their views go through the increment below.
+            if attempt == INSERT_ATTEMPTS - 1:
+                raise
+    _increment({existing[key]: views for key, views in counts.items() if key in existing})
+    return len(counts)
+
+
+def _existing(kind, counts):
+    """``{(student, target): pk}`` of the rows among ``counts`` that are already stored"""
+    from .models import StudentProgress
+
+    target_field = f'{kind}_id'
+    return dict(
+        ((student, target), pk) for pk, student, target in StudentProgress.objects.filter(
+            student_id__in={student for student, _ in counts},
+            **{f'{target_field}__in': {target for _, target in counts}},
+        ).values_list('pk', 'student_id', target_field)
+    )
+
+
+def _insert(kind, counts):
+    from .models import StudentProgress
+
+    # The first view creates the row with no time spent, matching the old
+    # get_or_create behaviour; every further view adds one minute.
+    StudentProgress.objects.bulk_create([
+        StudentProgress(student_id=student, time_spent_minutes=views - 1, **{f'{kind}_id': target})
+        for (student, target), views in counts.items()
+    ])
+
+
+def _increment(increments):
+    from .models import StudentProgress
+
+    if increments:
+        StudentProgress.objects.filter(pk__in=increments).update(
+            time_spent_minutes=F('time_spent_minutes') + Case(
+                *[When(pk=pk, then=views) for pk, views in increments.items()],
+                output_field=IntegerField(),
+            )
+        )
+
+
+progress_buffer = ProgressBuffer()
+
+
+def record_view(student, ecosystem=None, session=None):
+    """Count a student's view of an ecosystem or session without touching the database"""
+    progress_buffer.record(
+        student.pk,
+        ecosystem_id=ecosystem.pk if ecosystem else None,
+        session_id=session.pk if session else None,
+    )
+
+
+def cache_is_shared():
+    """Whether the default cache is seen by the other worker processes"""
+    # Compared by name, so that checking does not import the dummy backend.
+    return settings.CACHES[DEFAULT_CACHE_ALIAS]['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def request_flush():
+    """Ask every process sharing the cache to flush its buffer on its next poll.
+
+    Returns False, without asking, when the cache is local to this process.
+    """
+    if not cache_is_shared():
+        return False
+    cache.set(FLUSH_REQUEST_KEY, time.time(), None)
+    return True
+
+
+def _flush_at_exit():
+    try:
+        progress_buffer.flush()
+    except Exception:
+        logger.exception('Could not flush student progress at exit')
+
+
+atexit.register(_flush_at_exit)
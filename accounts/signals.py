@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .backends import forget_user, remember_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def refresh_cached_user(sender, instance, raw=False, **kwargs):
+    # Fixtures may load a user before the rows it depends on; only drop the old snapshot.
+    if raw:
+        forget_user(instance.pk)
+    else:
+        remember_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
@@ -1,3 +1,266 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from virtual_zoo import replicas
+from virtual_zoo.testing import forbid_lazy_loads
+from ecosystem.models import Ecosystem
+from educational_sessions.models import EducationalSession, SessionComment, SessionQuiz
+from .models import User, StudentProgress
+from . import backends, progress
+from .progress import progress_buffer
+
+
+@override_settings(STUDENT_PROGRESS_FLUSH_INTERVAL=0)
+class ProgressBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='pw', role='student')
+        cls.ecosystem = Ecosystem.objects.create(
+            name='Amazon', description='Rainforest', location='South America', climate='Tropical',
+        )
+
+    def setUp(self):
+        progress_buffer.drain()
+        self.client.force_login(self.student)
+
+    def test_detail_view_does_not_write_progress(self):
+        url = reverse('ecosystem:detail', args=[self.ecosystem.pk])
+        for _ in range(3):
+            self.client.get(url)
+        self.assertFalse(StudentProgress.objects.exists())
+        self.assertEqual(len(progress_buffer), 1)
+
+    def test_flush_creates_then_increments(self):
+        url = reverse('ecosystem:detail', args=[self.ecosystem.pk])
+        for _ in range(3):
+            self.client.get(url)
+        progress_buffer.flush()
+        progress = StudentProgress.objects.get(student=self.student, ecosystem=self.ecosystem)
+        self.assertEqual(progress.time_spent_minutes, 2)
+
+        for _ in range(2):
+            self.client.get(url)
+        with self.assertNumQueries(4):
+            # SAVEPOINT, SELECT existing rows, UPDATE, RELEASE SAVEPOINT
+            progress_buffer.flush()
+        progress.refresh_from_db()
+        self.assertEqual(progress.time_spent_minutes, 4)
+        self.assertEqual(len(progress_buffer), 0)
+
+    def test_views_are_kept_when_another_flush_inserts_first(self):
+        progress_buffer.record(self.student.pk, ecosystem_id=self.ecosystem.pk)
+        progress_buffer.record(self.student.pk, ecosystem_id=self.ecosystem.pk)
+        # Another worker inserts the row between this flush's read and its insert.
+        StudentProgress.objects.create(student=self.student, ecosystem=self.ecosystem, time_spent_minutes=5)
+        read_existing = progress._existing
+        reads = iter([lambda kind, counts: {}, read_existing])
+        with mock.patch.object(progress, '_existing', side_effect=lambda *args: next(reads)(*args)):
+            progress_buffer.flush()
+        row = StudentProgress.objects.get(student=self.student, ecosystem=self.ecosystem)
+        self.assertEqual(row.time_spent_minutes, 7)
+
+    def test_flush_command_without_a_shared_cache(self):
+        progress_buffer.record(self.student.pk, ecosystem_id=self.ecosystem.pk)
+        stdout, stderr = StringIO(), StringIO()
+        call_command('flush_student_progress', stdout=stdout, stderr=stderr)
+        self.assertIn('only this process was flushed', stderr.getvalue())
+        self.assertIn('Flushed 1 pending', stdout.getvalue())
+        self.assertIsNone(cache.get(progress.FLUSH_REQUEST_KEY))
+
+
+class StudentDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='pw', role='student')
+
+    def visit(self, count):
+        # Ecosystem names are unique, so carry on numbering from earlier visits.
+        start = Ecosystem.objects.count()
+        for i in range(start, start + count):
+            ecosystem = Ecosystem.objects.create(
+                name=f'Ecosystem {i}', description='Description', location='Earth', climate='Mild',
+            )
+            StudentProgress.objects.create(student=self.student, ecosystem=ecosystem, time_spent_minutes=i)
+
+    def test_statistics(self):
+        self.visit(4)
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('accounts:student_dashboard'))
+        self.assertEqual(response.context['total_ecosystems_visited'], 4)
+        self.assertEqual(response.context['total_sessions_watched'], 0)
+        self.assertEqual(response.context['total_time_spent'], 6)
+
+    def test_progress_is_rendered_without_lazy_loads(self):
+        self.visit(3)
+        self.client.force_login(self.student)
+        with forbid_lazy_loads():
+            response = self.client.get(reverse('accounts:student_dashboard'))
+        self.assertContains(response, 'Ecosystem 2')
+
+    def test_progress_is_unique_per_target(self):
+        self.visit(1)
+        ecosystem = Ecosystem.objects.get()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StudentProgress.objects.create(student=self.student, ecosystem=ecosystem)
+        # The constraint is per student.
+        other = User.objects.create_user('other', password='pw', role='student')
+        StudentProgress.objects.create(student=other, ecosystem=ecosystem)
+
+    def test_query_count_does_not_grow_with_visits(self):
+        self.client.force_login(self.student)
+        url = reverse('accounts:student_dashboard')
+        self.visit(1)
+        # user, aggregate, progress list, enrollments; the session is cached
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        self.visit(10)
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+
+class TeacherDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw', role='teacher')
+        cls.students = [User.objects.create_user(f'student{i}', password='pw', role='student') for i in range(4)]
+
+    def add_sessions(self, count, days=7):
+        sessions = []
+        for i in range(count):
+            sessions.append(EducationalSession.objects.create(
+                title=f'Session {i}', description='Lecture.', teacher=self.teacher,
+                scheduled_date=timezone.now() + timedelta(days=days), duration_minutes=60, max_students=10,
+            ))
+        return sessions
+
+    def test_statistics(self):
+        upcoming, past = self.add_sessions(1)[0], self.add_sessions(1, days=-7)[0]
+        for i, student in enumerate(self.students):
+            enrollment = upcoming.enroll(student)
+            enrollment.attended = i < 3
+            enrollment.save()
+        past.enroll(self.students[0])
+        SessionQuiz.objects.create(session=past, question='Q?', option_a='A', option_b='B', correct_answer='A')
+        SessionComment.objects.create(session=upcoming, user=self.students[0], content='Hi')
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('accounts:teacher_dashboard'))
+        context = response.context
+        self.assertEqual(context['total_sessions'], 2)
+        self.assertEqual(context['upcoming_sessions'], 1)
+        self.assertEqual(context['total_enrollments'], 5)
+        self.assertEqual(context['attendance_rate'], 60)
+        self.assertEqual((context['total_quizzes'], context['total_comments']), (1, 1))
+        by_pk = {session.pk: session for session in context['page_obj']}
+        self.assertEqual(by_pk[upcoming.pk].attended_count, 3)
+        self.assertEqual(by_pk[past.pk].quiz_count, 1)
+
+    def test_query_count_does_not_grow_with_sessions(self):
+        self.client.force_login(self.teacher)
+        url = reverse('accounts:teacher_dashboard')
+        self.add_sessions(2)
+        # user, statistics, recent sessions, session page; the session is cached
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        self.add_sessions(40)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['page_obj']), 12)
+        self.assertTrue(response.context['page_obj'].has_next())
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The backend needs a cache shared between processes, as in production.
+        location = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, location)
+        cls.enterClassContext(override_settings(
+            AUTHENTICATION_BACKENDS=['accounts.backends.CachedModelBackend'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}},
+        ))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('teacher', password='pw', role='teacher', email='t@example.com')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('accounts:teacher_dashboard')
+
+    def auth_queries(self, client=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = (client or self.client).get(self.url)
+        return response, [q['sql'] for q in queries if 'accounts_user' in q['sql'] or 'django_session' in q['sql']]
+
+    def test_warm_request_makes_no_auth_queries(self):
+        response, queries = self.auth_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['user'].get_deferred_fields(), {
+            'password', 'last_login', 'email', 'date_joined', 'phone_number', 'bio', 'created_at', 'updated_at',
+        })
+
+    def test_cold_cache_loads_once(self):
+        cache.clear()
+        self.assertEqual(len(self.auth_queries()[1]), 2)  # the session and the user
+        self.assertEqual(self.auth_queries()[1], [])
+
+    def test_saving_the_user_refreshes_the_snapshot(self):
+        self.auth_queries()
+        self.user.role = 'student'
+        self.user.save()
+        response, queries = self.auth_queries()
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(queries, [])
+
+    def test_password_change_and_deactivation_log_out(self):
+        self.user.set_password('new password')
+        self.user.save()
+        self.assertRedirects(self.auth_queries()[0], f"{reverse('accounts:login')}?next={self.url}")
+
+        self.client.force_login(self.user)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.auth_queries()[0].status_code, 302)
+
+    def test_profile_shows_every_column(self):
+        self.assertContains(self.client.get(reverse('accounts:profile')), 't@example.com')
+
+    async def test_async_views_use_the_snapshot(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('ecosystem:list'))
+        self.assertEqual(response.context['user'].username, 'teacher')
+        self.assertIn('password', response.context['user'].get_deferred_fields())
+
+    def test_snapshots_expire_and_follow_the_secret_key(self):
+        self.auth_queries()
+        self.assertIsNotNone(cache.get(backends._key(self.user.pk)))
+        with override_settings(SECRET_KEY='rotated'):
+            self.assertIsNone(cache.get(backends._key(self.user.pk)))
+        with override_settings(AUTH_USER_CACHE_TIMEOUT=0):
+            self.user.save()
+        self.assertEqual(len(self.auth_queries()[1]), 1)  # the user again
+
+    def test_misses_read_the_primary(self):
+        # The test database has no "replica" alias: reading there would fail.
+        token = replicas._routing.set(replicas.RequestRouting('replica'))
+        self.addCleanup(replicas._routing.reset, token)
+        self.assertEqual(backends.CachedModelBackend().get_user(self.user.pk), self.user)
+
+    def test_a_process_local_cache_is_rejected(self):
+        self.assertEqual(run_checks(tags=['caches']), [])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([error.id for error in run_checks(tags=['caches'])], ['accounts.E001'])
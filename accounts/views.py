@@ -5,8 +5,11 @@ from django.contrib import messages
 from django.views.generic import CreateView
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from virtual_zoo.pagination import KeysetPaginator
 from .forms import UserRegistrationForm
-from .models import StudentProgress
+from .models import StudentProgress, User
 from ecosystem.models import Ecosystem
 from educational_sessions.models import EducationalSession, SessionEnrollment
 
@@ -43,7 +46,9 @@ def logout_view(request):
 
 @login_required
 def profile_view(request):
-    return render(request, 'accounts/profile.html', {'user': request.user})
+    # request.user only holds the columns of its cached snapshot; the profile shows them all.
+    user = User.objects.get(pk=request.user.pk)
+    return render(request, 'accounts/profile.html', {'user': user})
 
 
 @login_required
@@ -52,33 +57,31 @@ def student_dashboard(request):
         messages.error(request, 'Access denied. Student dashboard only.')
         return redirect('home')
     
-    # Get student progress
-    progress_ecosystems = StudentProgress.objects.filter(
-        student=request.user,
-        ecosystem__isnull=False
-    ).select_related('ecosystem')
+    # Statistics in a single conditional aggregate
+    stats = StudentProgress.objects.filter(student=request.user).aggregate(
+        total_ecosystems_visited=Count('pk', filter=Q(ecosystem__isnull=False)),
+        total_sessions_watched=Count('pk', filter=Q(session__isnull=False)),
+        total_time_spent=Coalesce(Sum('time_spent_minutes'), 0),
+    )
     
-    progress_sessions = StudentProgress.objects.filter(
-        student=request.user,
-        session__isnull=False
-    ).select_related('session')
+    # Progress lists from one query, split by target
+    progress = StudentProgress.objects.for_dashboard().filter(student=request.user)
+    progress_ecosystems = []
+    progress_sessions = []
+    for item in progress:
+        if item.ecosystem_id:
+            progress_ecosystems.append(item)
+        elif item.session_id:
+            progress_sessions.append(item)
     
-    enrollments = SessionEnrollment.objects.filter(student=request.user).select_related('session')
-    
-    # Statistics
-    total_ecosystems_visited = progress_ecosystems.count()
-    total_sessions_watched = progress_sessions.count()
-    total_enrollments = enrollments.count()
-    total_time_spent = sum(p.time_spent_minutes for p in progress_ecosystems) + sum(p.time_spent_minutes for p in progress_sessions)
+    enrollments = list(SessionEnrollment.objects.filter(student=request.user).select_related('session'))
     
     return render(request, 'accounts/student_dashboard.html', {
         'progress_ecosystems': progress_ecosystems,
         'progress_sessions': progress_sessions,
         'enrollments': enrollments,
-        'total_ecosystems_visited': total_ecosystems_visited,
-        'total_sessions_watched': total_sessions_watched,
-        'total_enrollments': total_enrollments,
-        'total_time_spent': total_time_spent,
+        'total_enrollments': len(enrollments),
+        **stats,
     })
 
 
@@ -88,21 +91,27 @@ def teacher_dashboard(request):
         messages.error(request, 'Access denied. Teacher dashboard only.')
         return redirect('home')
     
-    # Get teacher's sessions
-    sessions = EducationalSession.objects.filter(teacher=request.user)
-    
-    # Statistics
-    total_sessions = sessions.count()
-    total_enrollments = SessionEnrollment.objects.filter(session__teacher=request.user).count()
-    upcoming_sessions = sessions.filter(scheduled_date__gte=timezone.now()).count()
+    # Every figure comes from the same annotated queryset
+    sessions = EducationalSession.objects.filter(teacher=request.user).with_stats()
+    stats = sessions.aggregate(
+        total_sessions=Count('pk'),
+        upcoming_sessions=Count('pk', filter=Q(scheduled_date__gte=timezone.now())),
+        total_enrollments=Coalesce(Sum('seats_taken'), 0),
+        total_attended=Coalesce(Sum('attended_count'), 0),
+        total_quizzes=Coalesce(Sum('quiz_count'), 0),
+        total_comments=Coalesce(Sum('comment_count'), 0),
+    )
+    if stats['total_enrollments']:
+        stats['attendance_rate'] = round(100 * stats['total_attended'] / stats['total_enrollments'])
+    else:
+        stats['attendance_rate'] = None
     
-    # Recent sessions
     recent_sessions = sessions.order_by('-created_at')[:5]
+    paginator = KeysetPaginator(sessions, 12, ('-scheduled_date', '-pk'))
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     return render(request, 'accounts/teacher_dashboard.html', {
-        'sessions': sessions,
-        'total_sessions': total_sessions,
-        'total_enrollments': total_enrollments,
-        'upcoming_sessions': upcoming_sessions,
+        'page_obj': page_obj,
         'recent_sessions': recent_sessions,
+        **stats,
     })
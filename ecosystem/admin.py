@@ -1,9 +1,56 @@
-from django.contrib import admin
+import io
+
+from django.contrib import admin, messages
+from django.shortcuts import redirect, render
+from django.urls import path, reverse
+from . import importers
+from .forms import CatalogImportForm
 from .models import Ecosystem, Animal
 
 
+class CatalogImportMixin:
+    """Adds an "Import" button to the changelist that bulk-loads a CSV/JSONL upload"""
+    change_list_template = 'admin/ecosystem/import_change_list.html'
+    import_kind = None
+    # Rejected rows listed in the messages; the rest are only counted.
+    max_reported_errors = 20
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view),
+                 name=f'{opts.app_label}_{opts.model_name}_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:index')
+        opts = self.model._meta
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            lines = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = importers.import_file(self.import_kind, lines, form.fmt, user=request.user)
+            except UnicodeDecodeError:
+                messages.error(request, 'The file is not UTF-8 encoded.')
+                return redirect(request.path)
+            level = messages.WARNING if result.errors else messages.SUCCESS
+            messages.add_message(request, level, f'Imported {opts.verbose_name_plural}: {result}.')
+            for line, error in result.errors[:self.max_reported_errors]:
+                messages.error(request, f'Line {line}: {error}')
+            return redirect(reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'))
+        return render(request, 'admin/ecosystem/import.html', {
+            **self.admin_site.each_context(request),
+            'opts': opts,
+            'form': form,
+            'title': f'Import {opts.verbose_name_plural}',
+            'columns': importers.IMPORTS[self.import_kind][1],
+        })
+
+
 @admin.register(Ecosystem)
-class EcosystemAdmin(admin.ModelAdmin):
+class EcosystemAdmin(CatalogImportMixin, admin.ModelAdmin):
+    import_kind = 'ecosystems'
     list_display = ['name', 'region', 'era', 'location', 'climate', 'created_by', 'created_at']
     list_filter = ['region', 'era', 'climate', 'created_at']
     search_fields = ['name', 'description', 'location', 'vegetation']
@@ -25,7 +72,8 @@ class EcosystemAdmin(admin.ModelAdmin):
 
 
 @admin.register(Animal)
-class AnimalAdmin(admin.ModelAdmin):
+class AnimalAdmin(CatalogImportMixin, admin.ModelAdmin):
+    import_kind = 'animals'
     list_display = ['name', 'scientific_name', 'species_type', 'ecosystem', 'diet', 'conservation_status', 'created_at']
     list_filter = ['ecosystem', 'species_type', 'diet', 'conservation_status', 'created_at']
     search_fields = ['name', 'scientific_name', 'description', 'habitat']
@@ -0,0 +1,56 @@
+"""Ecosystems and animals in the JSON API (see ``virtual_zoo.api``)"""
+from virtual_zoo import api
+from .models import Ecosystem, Animal
+
+ANIMAL_FIELDS = {
+    'id': 'pk',
+    'name': 'name',
+    'scientific_name': 'scientific_name',
+    'species_type': 'species_type',
+    'description': 'description',
+    'habitat': 'habitat',
+    'diet': 'diet',
+    'conservation_status': 'conservation_status',
+    'image': 'image',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+ECOSYSTEMS = api.Resource(
+    Ecosystem.objects.all,
+    fields={
+        'id': 'pk',
+        'name': 'name',
+        'description': 'description',
+        'location': 'location',
+        'region': 'region',
+        'era': 'era',
+        'climate': 'climate',
+        'temperature_min': 'temperature_min',
+        'temperature_max': 'temperature_max',
+        'vegetation': 'vegetation',
+        'precipitation': 'precipitation',
+        'image': 'image',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+    ordering=('-created_at', '-pk'),
+    timestamp='updated_at',
+    filters={'region': 'region', 'era': 'era'},
+    children={
+        'animals': api.Child(Animal, 'ecosystem', ANIMAL_FIELDS, 'updated_at', ordering=('name', 'pk')),
+    },
+)
+
+ANIMALS = api.Resource(
+    Animal.objects.all,
+    fields={**ANIMAL_FIELDS, 'ecosystem': 'ecosystem', 'ecosystem_name': 'ecosystem__name'},
+    ordering=('pk',),
+    timestamp='updated_at',
+    filters={'ecosystem': 'ecosystem', 'species_type': 'species_type'},
+)
+
+ecosystem_list = api.list_view(ECOSYSTEMS)
+ecosystem_detail = api.detail_view(ECOSYSTEMS)
+animal_list = api.list_view(ANIMALS)
+animal_detail = api.detail_view(ANIMALS)
@@ -1,4 +1,5 @@
 from django import forms
+from . import importers
 from .models import Ecosystem, Animal
 
 
@@ -36,3 +37,16 @@ class AnimalForm(forms.ModelForm):
             'image': forms.FileInput(attrs={'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-green-500 focus:border-transparent'}),
         }
 
+
+
+class CatalogImportForm(forms.Form):
+    """Upload of a CSV or JSON Lines file for ``ecosystem.importers``"""
+    file = forms.FileField(help_text='A .csv file with a header row, or a .jsonl file with one JSON object per line.')
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        try:
+            self.fmt = importers.guess_format(upload.name)
+        except ValueError as exc:
+            raise forms.ValidationError(str(exc))
+        return upload
@@ -0,0 +1,129 @@
+"""Fixed-width image derivatives for responsive ``srcset`` markup.
+
+Every uploaded image on Ecosystem, Animal and EducationalSession gets resized
+copies stored next to the original, e.g. ``ecosystems/amazon.jpg`` gets
+``ecosystems/amazon.w320.webp``. They are generated on save by the signal
+handlers and can be backfilled with ``manage.py generate_thumbnails``.
+
+The widths generated for an image are recorded in the cache when they are
+written, so rendering ``{% responsive_image %}`` does not ask the storage which
+files exist (a round trip per width on remote storage). An image whose entry
+has expired is checked against the storage once and recorded again.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import ExifTags, Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def widths():
+    return tuple(getattr(settings, 'RESPONSIVE_IMAGE_WIDTHS', (320, 640, 1024)))
+
+
+def image_format():
+    return getattr(settings, 'RESPONSIVE_IMAGE_FORMAT', 'webp')
+
+
+def derivative_name(name, width, fmt=None):
+    fmt = fmt or image_format()
+    root, _ = os.path.splitext(name)
+    extension = 'jpg' if fmt == 'jpeg' else fmt
+    return f'{root}.w{width}.{extension}'
+
+
+def _widths_key(name):
+    # The widths and the format are part of the key, so changing the settings re-checks every image.
+    digest = hashlib.md5(f'{image_format()}:{widths()}:{name}'.encode(), usedforsecurity=False).hexdigest()
+    return f'images:derivatives:{digest}'
+
+
+def _record_widths(field_file):
+    """Check which derivatives of ``field_file`` exist and cache their widths"""
+    storage = field_file.storage
+    available = [width for width in widths() if storage.exists(derivative_name(field_file.name, width))]
+    cache.set(_widths_key(field_file.name), available, getattr(settings, 'RESPONSIVE_IMAGE_CACHE_TIMEOUT', 86400))
+    return available
+
+
+def existing_derivatives(field_file):
+    """Return ``[(width, url), ...]`` for the derivatives already generated"""
+    if not field_file:
+        return []
+    available = cache.get(_widths_key(field_file.name))
+    if available is None:
+        available = _record_widths(field_file)
+    storage = field_file.storage
+    return [(width, storage.url(derivative_name(field_file.name, width))) for width in available]
+
+
+def _upright_width(image):
+    """The width of ``image`` once its EXIF orientation is applied, from its header"""
+    if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+        return image.height
+    return image.width
+
+
+def generate_derivatives(field_file, overwrite=False):
+    """Write the missing derivatives of ``field_file``; returns how many were written.
+
+    Widths wider than the original are skipped; upscaling only wastes bytes.
+    """
+    if not field_file:
+        return 0
+    storage = field_file.storage
+    pending = [w for w in widths() if overwrite or not storage.exists(derivative_name(field_file.name, w))]
+    if not pending:
+        _record_widths(field_file)
+        return 0
+    fmt = image_format()
+    pil_format, save_options = FORMATS[fmt]
+    try:
+        with storage.open(field_file.name, 'rb') as handle:
+            image = Image.open(handle)  # reads the header only
+            # Widths wider than the original are never written; when no other
+            # width is missing, the original need not be decoded at all.
+            pending = [w for w in pending if w < _upright_width(image)]
+            if not pending:
+                _record_widths(field_file)
+                return 0
+            original = ImageOps.exif_transpose(image)
+            original.load()
+    except (OSError, ValueError) as e:
+        logger.warning('Could not read %s for thumbnails: %s', field_file.name, e)
+        return 0
+    if pil_format == 'JPEG' and original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+    written = 0
+    for width in pending:
+        height = round(original.height * width / original.width)
+        resized = original.resize((width, height), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        resized.save(buffer, pil_format, **save_options)
+        name = derivative_name(field_file.name, width)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(buffer.getvalue()))
+        written += 1
+    _record_widths(field_file)
+    return written
+
+
+def generate_for_instance(instance, field_name='image'):
+    try:
+        return generate_derivatives(getattr(instance, field_name))
+    except Exception:
+        # A broken upload must never make the save itself fail.
+        logger.exception('Could not generate thumbnails for %r', instance)
+        return 0
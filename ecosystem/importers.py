@@ -0,0 +1,222 @@
+"""Bulk import of ecosystems and animals from CSV or JSON Lines.
+
+Rows are read lazily and handled in batches. Each row is checked with the
+model's own field validation; the valid rows of a batch are upserted with one
+``bulk_create(update_conflicts=True)`` keyed on the natural key (the ecosystem
+name, or the ecosystem and scientific name of an animal) and the invalid ones
+are reported by line number without stopping the import. A batch the database
+rejects, e.g. on a constraint, is retried row by row so that only the offending
+lines are reported. Animals name their ecosystem in an ``ecosystem`` column.
+An update only writes the columns the row supplies; the others keep their
+stored values (a new row gets their defaults).
+
+Used by ``manage.py import_catalog`` and the import page of the admin.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from virtual_zoo import catalog_cache
+from . import search
+from .models import Ecosystem, Animal
+
+FORMATS = ('csv', 'jsonl')
+BATCH_SIZE = 500
+
+
+# kind -> (model, imported fields, natural key)
+IMPORTS = {
+    'ecosystems': (Ecosystem, (
+        'name', 'description', 'location', 'region', 'era', 'climate', 'temperature_min', 'temperature_max',
+        'vegetation', 'precipitation',
+    ), ('name',)),
+    'animals': (Animal, (
+        'ecosystem', 'name', 'scientific_name', 'species_type', 'description', 'habitat', 'diet',
+        'conservation_status',
+    ), ('ecosystem', 'scientific_name')),
+}
+
+
+class ImportResult:
+    """Counts of an import and the ``(line, message)`` of every rejected row"""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def __str__(self):
+        return f'{self.created} created, {self.updated} updated, {len(self.errors)} rejected'
+
+
+def guess_format(filename):
+    fmt = filename.rsplit('.', 1)[-1].lower()
+    if fmt in ('ndjson', 'json'):
+        fmt = 'jsonl'
+    if fmt not in FORMATS:
+        raise ValueError(f'Cannot tell the format of "{filename}"; expected a .csv or .jsonl file.')
+    return fmt
+
+
+def read_rows(lines, fmt):
+    """Yield ``(line number, dict)`` pairs from an iterable of text lines.
+
+    A JSON Lines row that does not parse is yielded as its error message.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            # Values of a short row are None; treat them like empty cells.
+            yield reader.line_num, {key: value or '' for key, value in row.items() if key is not None}
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, f'Invalid JSON: {exc}'
+            continue
+        yield number, row if isinstance(row, dict) else 'Expected a JSON object.'
+
+
+def _messages(error):
+    if hasattr(error, 'error_dict'):
+        return '; '.join(f'{field}: {" ".join(messages)}' for field, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+class Importer:
+    def __init__(self, kind, user=None, batch_size=BATCH_SIZE):
+        self.kind = kind
+        self.model, self.fields, self.key = IMPORTS[kind]
+        self.user = user
+        self.batch_size = batch_size
+        self.result = ImportResult()
+
+    def run(self, lines, fmt):
+        rows = read_rows(lines, fmt)
+        while batch := list(islice(rows, self.batch_size)):
+            self.import_batch(batch)
+        catalog_cache.invalidate(catalog_cache.ECOSYSTEMS)
+        return self.result
+
+    def import_batch(self, batch):
+        ecosystem_ids = self.resolve_ecosystems(batch) if self.kind == 'animals' else {}
+        objs = {}
+        for line, row in batch:
+            try:
+                obj = self.build(row, ecosystem_ids)
+            except ValidationError as exc:
+                self.result.errors.append((line, _messages(exc)))
+                continue
+            columns = tuple(name for name in self.fields if name in row and name != 'ecosystem')
+            # Within a batch the last row for a key wins; ON CONFLICT cannot touch a row twice.
+            objs[self.natural_key(obj)] = (line, obj, columns)
+        if not objs:
+            return
+
+        existing = self.existing_keys(obj for _, obj, _ in objs.values())
+        # One statement per set of supplied columns, so that no row overwrites a column it left out.
+        groups = {}
+        for line, obj, columns in objs.values():
+            groups.setdefault(columns, []).append((line, obj))
+        saved = []
+        for columns, rows in groups.items():
+            saved += self.upsert(rows, list(columns))
+        if not saved:
+            return
+        updated = sum(1 for _, obj in saved if self.natural_key(obj) in existing)
+        self.result.updated += updated
+        self.result.created += len(saved) - updated
+
+        # bulk_create skips the post_save handlers that keep the search index current.
+        if self.kind == 'animals':
+            affected = {obj.ecosystem_id for _, obj in saved}
+        else:
+            affected = Ecosystem.objects.filter(name__in=[obj.name for _, obj in saved]).values_list('pk', flat=True)
+        for ecosystem_id in affected:
+            search.index_ecosystem(ecosystem_id)
+
+    def upsert(self, rows, fields):
+        """Save the ``(line, obj)`` rows, updating ``fields`` of stored ones; returns the rows saved.
+
+        The rows go in one statement. If the database rejects it, each row is
+        retried in its own savepoint and only the failing lines are reported.
+        """
+        if len(rows) > 1:
+            try:
+                self.save([obj for _, obj in rows], fields)
+                return rows
+            except DatabaseError:
+                pass
+        saved = []
+        for line, obj in rows:
+            try:
+                self.save([obj], fields)
+            except DatabaseError as exc:
+                self.result.errors.append((line, f'Not saved: {exc}'))
+            else:
+                saved.append((line, obj))
+        return saved
+
+    def save(self, objs, fields):
+        with transaction.atomic():
+            self.model.objects.bulk_create(
+                objs, update_conflicts=True, unique_fields=self.key, update_fields=fields + ['updated_at'],
+            )
+
+    def resolve_ecosystems(self, batch):
+        """Map the ecosystem names of a batch of animals to ids, in one query"""
+        names = {row.get('ecosystem') for _, row in batch if isinstance(row, dict)}
+        names = [name for name in names if isinstance(name, str)]
+        return dict(Ecosystem.objects.filter(name__in=names).values_list('name', 'pk'))
+
+    def build(self, row, ecosystem_ids):
+        """An unsaved, validated instance for ``row``; raises ValidationError"""
+        if not isinstance(row, dict):
+            raise ValidationError(row)
+        unknown = sorted(set(row) - set(self.fields))
+        if unknown:
+            raise ValidationError(f'Unknown columns: {", ".join(unknown)}.')
+        obj = self.model()
+        for name in self.fields:
+            if name == 'ecosystem' or name not in row:
+                continue
+            value = row[name]
+            if value == '' and self.model._meta.get_field(name).null:
+                value = None
+            setattr(obj, name, value)
+        if self.kind == 'animals':
+            name = row.get('ecosystem')
+            if not isinstance(name, str) or name not in ecosystem_ids:
+                raise ValidationError({'ecosystem': [f'No ecosystem named "{name}".']})
+            obj.ecosystem_id = ecosystem_ids[name]
+        else:
+            obj.created_by = self.user
+        # The foreign keys are resolved above; validating them again would cost a query per row.
+        obj.full_clean(exclude=['ecosystem', 'created_by', 'image'], validate_unique=False, validate_constraints=False)
+        return obj
+
+    def natural_key(self, obj):
+        if self.kind == 'animals':
+            return obj.ecosystem_id, obj.scientific_name
+        return obj.name
+
+    def existing_keys(self, objs):
+        """The natural keys among ``objs`` that are already stored"""
+        keys = {self.natural_key(obj) for obj in objs}
+        if self.kind == 'animals':
+            stored = Animal.objects.filter(
+                ecosystem_id__in={key[0] for key in keys}, scientific_name__in={key[1] for key in keys},
+            ).values_list('ecosystem_id', 'scientific_name')
+        else:
+            stored = Ecosystem.objects.filter(name__in=keys).values_list('name', flat=True)
+        return keys.intersection(stored)
+
+
+def import_file(kind, lines, fmt, user=None, batch_size=BATCH_SIZE):
+    """Import ``kind`` ('ecosystems' or 'animals') from text lines; returns an ImportResult"""
+    return Importer(kind, user, batch_size).run(lines, fmt)
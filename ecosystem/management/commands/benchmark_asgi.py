@@ -0,0 +1,132 @@
+import importlib.util
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from ecosystem.models import Ecosystem
+from educational_sessions.models import EducationalSession
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = ('Compares the concurrent-request throughput of the catalog pages served by uvicorn (ASGI) '
+            'and by a threaded WSGI server, against the configured database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per server, spread over the paths')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument('--threads', type=int, default=4, help='Worker threads of the WSGI server')
+        parser.add_argument('--wsgi', choices=['gunicorn', 'runserver'],
+                            help='WSGI server (default: gunicorn when installed, else runserver)')
+        parser.add_argument('--path', action='append', dest='paths', help='Only request this path (repeatable)')
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('uvicorn is not installed: pip install uvicorn')
+        wsgi = options['wsgi'] or ('gunicorn' if importlib.util.find_spec('gunicorn') else 'runserver')
+        paths = options['paths'] or self.default_paths()
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG is on: both servers pay for query logging and request profiling.'))
+
+        results = {}
+        for name in ('wsgi', 'asgi'):
+            port = free_port()
+            command = self.asgi_command(port) if name == 'asgi' else self.wsgi_command(wsgi, port, options['threads'])
+            self.stdout.write(f'{name}: {" ".join(command[2:])}')
+            # runserver logs every request to stderr; a pipe nobody reads would fill up and stall it.
+            log = tempfile.TemporaryFile()
+            server = subprocess.Popen(command, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=log)
+            try:
+                base = f'http://127.0.0.1:{port}'
+                self.wait_until_up(server, log, base + paths[0])
+                # Warm up the fragment cache and the connections of both servers alike.
+                self.run_load(base, paths, len(paths) * 2, options['concurrency'])
+                results[name] = self.run_load(base, paths, options['requests'], options['concurrency'])
+            finally:
+                server.terminate()
+                server.wait(10)
+                log.close()
+        self.report(results)
+
+    def default_paths(self):
+        ecosystem = Ecosystem.objects.order_by('pk').values_list('pk', flat=True).first()
+        session = EducationalSession.objects.order_by('pk').values_list('pk', flat=True).first()
+        if ecosystem is None or session is None:
+            raise CommandError('The database has no ecosystems or sessions; run create_demo_data or generate_load_data first.')
+        return [
+            reverse('home'),
+            reverse('ecosystem:list'),
+            reverse('ecosystem:detail', args=[ecosystem]),
+            reverse('educational_sessions:list'),
+            reverse('educational_sessions:detail', args=[session]),
+        ]
+
+    def asgi_command(self, port):
+        return [sys.executable, '-m', 'uvicorn', 'virtual_zoo.asgi:application',
+                '--port', str(port), '--log-level', 'warning', '--no-access-log']
+
+    def wsgi_command(self, server, port, threads):
+        if server == 'gunicorn':
+            return [sys.executable, '-m', 'gunicorn', 'virtual_zoo.wsgi:application',
+                    '--bind', f'127.0.0.1:{port}', '--worker-class', 'gthread', '--threads', str(threads)]
+        # runserver starts a thread per request; --threads does not apply.
+        return [sys.executable, 'manage.py', 'runserver', '--noreload', '--skip-checks', f'127.0.0.1:{port}']
+
+    def wait_until_up(self, server, log, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f'Server exited:\n{log.read().decode()[-2000:]}')
+            try:
+                urllib.request.urlopen(url, timeout=5).read()
+                return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError(f'Server did not answer {url} within {timeout}s')
+
+    def run_load(self, base, paths, total, concurrency):
+        def fetch(i):
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base + paths[i % len(paths)], timeout=30) as response:
+                    response.read()
+                    ok = response.status == 200
+            except (urllib.error.URLError, ConnectionError):
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - start
+        timings = sorted(duration * 1000 for duration, _ in samples)
+        return {
+            'rps': total / elapsed,
+            'p50_ms': statistics.median(timings),
+            'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            'errors': sum(not ok for _, ok in samples),
+        }
+
+    def report(self, results):
+        self.stdout.write(f'\n{"server":<8} {"req/s":>10} {"p50 ms":>10} {"p95 ms":>10} {"errors":>8}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<8} {result["rps"]:>10.1f} {result["p50_ms"]:>10.2f} {result["p95_ms"]:>10.2f} {result["errors"]:>8}'
+            )
+        ratio = results['asgi']['rps'] / results['wsgi']['rps']
+        self.stdout.write(self.style.SUCCESS(f'\nASGI throughput is {ratio:.2f}x the WSGI throughput.'))
@@ -0,0 +1,119 @@
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'startup.json'
+
+# "import time:       123 |       4567 |   package.module" (self and cumulative in microseconds)
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+PROJECT_PACKAGES = ('virtual_zoo', 'accounts', 'ecosystem', 'educational_sessions', 'sessions', 'theme')
+
+
+def parse_importtime(output):
+    """Summarise ``python -X importtime`` output.
+
+    Returns the number of modules imported, their total own import time in ms
+    and the self time in ms of each project package, summed over its modules.
+    """
+    modules = 0
+    total_us = 0
+    packages = {}
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, name = int(match.group(1)), match.group(4)
+        modules += 1
+        total_us += self_us
+        package = name.split('.', 1)[0]
+        if package in PROJECT_PACKAGES:
+            packages[package] = packages.get(package, 0) + self_us
+    return {
+        'modules': modules,
+        'total_ms': round(total_us / 1000, 2),
+        'packages': {name: round(us / 1000, 2) for name, us in sorted(packages.items())},
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measures the import time of "manage.py check" and checks it against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to time; the median is reported')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline JSON file to compare against')
+        parser.add_argument('--save-baseline', action='store_true', help='Record this run as the new baseline')
+        parser.add_argument('--latency-tolerance', type=float, default=1.5,
+                            help='Fail when the import time exceeds the baseline by this factor')
+        parser.add_argument('--top', type=int, default=10, help='Also list the slowest top-level imports')
+
+    def handle(self, *args, **options):
+        runs = [self.measure() for _ in range(max(1, options['runs']))]
+        result = {
+            'modules': max(run['modules'] for run in runs),
+            'total_ms': round(statistics.median(run['total_ms'] for run in runs), 2),
+            'packages': {
+                name: round(statistics.median(run['packages'].get(name, 0) for run in runs), 2)
+                for name in sorted({name for run in runs for name in run['packages']})
+            },
+        }
+        self.report(result, options['top'])
+
+        baseline_path = Path(options['baseline'])
+        python = platform.python_version()
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({'python': python, 'startup': result}, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+        elif baseline_path.exists():
+            self.check_budget(result, json.loads(baseline_path.read_text()), python, options['latency_tolerance'])
+        else:
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}; run with --save-baseline to record one.'))
+
+    def measure(self):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', 'manage.py', 'check'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f'manage.py check failed:\n{completed.stderr[-2000:]}')
+        self.last_output = completed.stderr
+        return parse_importtime(completed.stderr)
+
+    def report(self, result, top):
+        self.stdout.write(f'{result["modules"]} modules imported in {result["total_ms"]:.2f} ms (median)')
+        for name, ms in result['packages'].items():
+            self.stdout.write(f'  {name:<24} {ms:>10.2f} ms')
+        if top:
+            # Top-level imports of the last run, by cumulative time
+            imports = [
+                (int(match.group(2)), match.group(4))
+                for match in map(IMPORT_LINE.match, self.last_output.splitlines())
+                if match and len(match.group(3)) == 1
+            ]
+            self.stdout.write('\nSlowest top-level imports of the last run:')
+            for us, name in sorted(imports, reverse=True)[:top]:
+                self.stdout.write(f'  {name:<40} {us / 1000:>10.2f} ms')
+
+    def check_budget(self, result, baseline, python, tolerance):
+        if baseline.get('python') != python:
+            # Both the stdlib imports and their cost change between Python versions.
+            self.stdout.write(self.style.WARNING(
+                f'Baseline was recorded on Python {baseline.get("python")}; budgets are skipped on {python}.'
+            ))
+            return
+        budget = baseline['startup']
+        failures = []
+        if result['modules'] > budget['modules']:
+            failures.append(f'{result["modules"]} modules imported, budget {budget["modules"]}')
+        if result['total_ms'] > budget['total_ms'] * tolerance:
+            failures.append(f'import time {result["total_ms"]:.2f} ms, budget {budget["total_ms"] * tolerance:.2f} ms')
+        if failures:
+            raise CommandError('Startup budget exceeded:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('\nStartup is within budget.'))
@@ -0,0 +1,145 @@
+import json
+from io import StringIO
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+from accounts.progress import progress_buffer
+from ecosystem.models import Ecosystem
+from educational_sessions.models import EducationalSession
+
+User = get_user_model()
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+# Fixed dataset handed to generate_load_data; change it and the baseline must be re-recorded.
+DATASET = {
+    'seed': 1,
+    'teachers': 10,
+    'students': 200,
+    'ecosystems': 300,
+    'animals': 6000,
+    'sessions': 600,
+    'enrollments': 6000,
+    'progress': 8000,
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the main views against a seeded test database and checks them against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline JSON file to compare against')
+        parser.add_argument('--save-baseline', action='store_true', help='Record this run as the new baseline')
+        parser.add_argument('--latency-tolerance', type=float, default=1.5,
+                            help='Fail when p95 latency exceeds the baseline p95 by this factor')
+        parser.add_argument('--warm-cache', action='store_true', help='Keep the fragment cache between requests')
+        parser.add_argument('--view', action='append', dest='views', help='Only benchmark the named view (repeatable)')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(STUDENT_PROGRESS_FLUSH_INTERVAL=0):
+                self.stdout.write(f'Seeding benchmark dataset on {connection.vendor}...')
+                call_command('generate_load_data', prefix='bench', batch_size=2000, stdout=StringIO(), **DATASET)
+                results = self.run_benchmarks(options)
+        finally:
+            # Views recorded by the student requests belong to the throwaway database.
+            progress_buffer.drain()
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.report(results)
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({'vendor': connection.vendor, 'views': results}, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+        elif baseline_path.exists():
+            self.check_budgets(results, json.loads(baseline_path.read_text()), options['latency_tolerance'])
+        else:
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}; run with --save-baseline to record one.'))
+
+    def targets(self):
+        ecosystem = Ecosystem.objects.order_by('pk').first()
+        session = EducationalSession.objects.order_by('pk').first()
+        student = User.objects.get(username='bench_student_0')
+        teacher = User.objects.get(username='bench_teacher_0')
+        return {
+            'ecosystem_list': (None, reverse('ecosystem:list')),
+            'ecosystem_list_species': (None, reverse('ecosystem:list') + '?species=extinct'),
+            'ecosystem_detail': (None, reverse('ecosystem:detail', args=[ecosystem.pk])),
+            'session_detail': (student, reverse('educational_sessions:detail', args=[session.pk])),
+            'student_dashboard': (student, reverse('accounts:student_dashboard')),
+            'teacher_dashboard': (teacher, reverse('accounts:teacher_dashboard')),
+        }
+
+    def run_benchmarks(self, options):
+        results = {}
+        for name, (user, url) in self.targets().items():
+            if options['views'] and name not in options['views']:
+                continue
+            client = Client()
+            if user:
+                client.force_login(user)
+            for _ in range(options['warmup']):
+                self.request(client, url, options)
+            timings = []
+            queries = 0
+            for _ in range(options['iterations']):
+                elapsed, queries = self.request(client, url, options)
+                timings.append(elapsed)
+            timings.sort()
+            results[name] = {
+                'queries': queries,
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            }
+        return results
+
+    def request(self, client, url, options):
+        if not options['warm_cache']:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+        return elapsed, len(captured)
+
+    def report(self, results):
+        self.stdout.write(f'\n{"view":<24} {"queries":>8} {"p50 ms":>10} {"p95 ms":>10}')
+        for name, result in results.items():
+            self.stdout.write(f'{name:<24} {result["queries"]:>8} {result["p50_ms"]:>10.2f} {result["p95_ms"]:>10.2f}')
+
+    def check_budgets(self, results, baseline, tolerance):
+        failures = []
+        if baseline.get('vendor') != connection.vendor:
+            self.stdout.write(self.style.WARNING(
+                f'Baseline was recorded on {baseline.get("vendor")}; latency budgets are skipped on {connection.vendor}.'
+            ))
+            tolerance = None
+        for name, result in results.items():
+            budget = baseline['views'].get(name)
+            if not budget:
+                continue
+            if result['queries'] > budget['queries']:
+                failures.append(f'{name}: {result["queries"]} queries, budget {budget["queries"]}')
+            if tolerance and result['p95_ms'] > budget['p95_ms'] * tolerance:
+                failures.append(f'{name}: p95 {result["p95_ms"]:.2f} ms, budget {budget["p95_ms"] * tolerance:.2f} ms')
+        if failures:
+            raise CommandError('Performance budget exceeded:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('\nAll views are within budget.'))
@@ -1,33 +1,128 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from ecosystem.models import Ecosystem, Animal
 from educational_sessions.models import EducationalSession, SessionResource, SessionComment, SessionQuiz
 from datetime import datetime, timedelta
 from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import json
 import requests
+from requests.adapters import HTTPAdapter
 from io import BytesIO
+from PIL import Image, ImageDraw
 from django.core.files.images import ImageFile
 from django.core.files.base import ContentFile
 
 User = get_user_model()
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+PLACEHOLDER_COLORS = [(5, 150, 105), (15, 118, 110), (22, 78, 99), (124, 58, 237), (219, 39, 119), (217, 119, 6)]
+
+
+class AssetCache:
+    """Content-addressed on-disk cache of downloaded demo images.
+    
+    Blobs are stored under ``blobs/<sha256 of content>`` and ``index.json`` maps
+    each source URL to its blob, so re-runs make no network requests.
+    """
+    
+    def __init__(self, root):
+        self.root = Path(root)
+        self.blobs = self.root / 'blobs'
+        self.index_path = self.root / 'index.json'
+        try:
+            self.index = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            self.index = {}
+    
+    def get(self, url):
+        digest = self.index.get(url)
+        if digest:
+            try:
+                return (self.blobs / digest).read_bytes()
+            except OSError:
+                pass
+        return None
+    
+    def put(self, url, content):
+        digest = hashlib.sha256(content).hexdigest()
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        blob = self.blobs / digest
+        if not blob.exists():
+            blob.write_bytes(content)
+        self.index[url] = digest
+    
+    def save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path.write_text(json.dumps(self.index, indent=2, sort_keys=True))
+
 
 class Command(BaseCommand):
     help = 'Creates demo ecosystems and educational sessions with all features including images and videos'
 
-    def download_image(self, url, filename):
-        """Download image from URL"""
+    def add_arguments(self, parser):
+        parser.add_argument('--offline', action='store_true', help='Never touch the network; use cached or generated placeholder images')
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent image downloads')
+        parser.add_argument('--cache-dir', default=str(Path(settings.BASE_DIR) / '.cache' / 'demo_assets'), help='Directory of the downloaded image cache')
+
+    def placeholder_image(self, url):
+        """Generate a labelled placeholder image, stable for a given URL"""
+        digest = hashlib.sha256(url.encode()).digest()
+        image = Image.new('RGB', (1200, 800), PLACEHOLDER_COLORS[digest[0] % len(PLACEHOLDER_COLORS)])
+        ImageDraw.Draw(image).text((40, 40), 'Virtual Zoo demo image', fill=(255, 255, 255))
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=80)
+        return buffer.getvalue()
+
+    def fetch(self, http, url):
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, timeout=10, headers=headers, allow_redirects=True)
+            response = http.get(url, timeout=10, allow_redirects=True)
             if response.status_code == 200 and response.content:
-                return ContentFile(response.content, name=filename)
+                return response.content
         except Exception as e:
             self.stdout.write(self.style.WARNING(f'Could not download {url}: {str(e)}'))
         return None
 
+    def fetch_assets(self, urls, workers, offline, cache):
+        """Fetch every URL once, concurrently, through the cache"""
+        assets = {}
+        missing = []
+        for url in dict.fromkeys(urls):
+            content = cache.get(url)
+            if content:
+                assets[url] = content
+            else:
+                missing.append(url)
+        
+        if missing and not offline:
+            self.stdout.write(f'Downloading {len(missing)} images with {workers} workers...')
+            with requests.Session() as http:
+                http.headers['User-Agent'] = USER_AGENT
+                adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+                http.mount('https://', adapter)
+                http.mount('http://', adapter)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    for url, content in zip(missing, pool.map(lambda u: self.fetch(http, u), missing)):
+                        if content:
+                            cache.put(url, content)
+                            assets[url] = content
+            cache.save()
+        
+        for url in missing:
+            if url not in assets and offline:
+                assets[url] = self.placeholder_image(url)
+        return assets
+
+    def download_image(self, url, filename):
+        """Return a prefetched image for URL"""
+        content = self.assets.get(url)
+        if content:
+            return ContentFile(content, name=filename)
+        return None
+
     def handle(self, *args, **options):
         self.stdout.write('Creating demo data with images and videos...')
         
@@ -103,6 +198,19 @@ class Command(BaseCommand):
             'Woolly Mammoth': 'https://via.placeholder.com/800x600/4A5568/FFFFFF?text=Woolly+Mammoth',
         }
         
+        # Session images (matching ecosystem images)
+        session_images = {
+            'Introduction to Amazon Rainforest Biodiversity': 'https://images.unsplash.com/photo-1441974231531-c6227db76b6e?ixlib=rb-4.0.3&auto=format&fit=crop&w=1200&q=80',
+            'Desert Adaptations Workshop': 'https://images.unsplash.com/photo-1509316785289-025f5b846b35?ixlib=rb-4.0.3&auto=format&fit=crop&w=1200&q=80',
+            'Arctic Tundra Virtual Field Trip': 'https://images.unsplash.com/photo-1518837695005-2083093ee35b?ixlib=rb-4.0.3&auto=format&fit=crop&w=1200&q=80',
+        }
+        
+        # Fetch all images up front, concurrently and through the on-disk cache
+        image_urls = [eco['image_url'] for eco in ecosystems_data] + list(animal_images.values()) + list(session_images.values())
+        self.assets = self.fetch_assets(
+            image_urls, max(1, options['workers']), options['offline'], AssetCache(options['cache_dir'])
+        )
+        
         created_ecosystems = []
         for eco_data in ecosystems_data:
             image_url = eco_data.pop('image_url', None)
@@ -171,13 +279,6 @@ class Command(BaseCommand):
             'Arctic Tundra Virtual Field Trip': 'https://www.youtube.com/watch?v=1MBWQzWXc-A',  # Arctic wildlife
         }
         
-        # Session images (matching ecosystem images)
-        session_images = {
-            'Introduction to Amazon Rainforest Biodiversity': 'https://images.unsplash.com/photo-1441974231531-c6227db76b6e?ixlib=rb-4.0.3&auto=format&fit=crop&w=1200&q=80',
-            'Desert Adaptations Workshop': 'https://images.unsplash.com/photo-1509316785289-025f5b846b35?ixlib=rb-4.0.3&auto=format&fit=crop&w=1200&q=80',
-            'Arctic Tundra Virtual Field Trip': 'https://images.unsplash.com/photo-1518837695005-2083093ee35b?ixlib=rb-4.0.3&auto=format&fit=crop&w=1200&q=80',
-        }
-        
         # Create 3 Demo Educational Sessions
         sessions_data = [
             {
@@ -266,4 +367,7 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('\nLogin credentials:'))
         self.stdout.write(self.style.SUCCESS('Admin: admin / admin123'))
         self.stdout.write(self.style.SUCCESS('Teacher: teacher1 / teacher123'))
-        self.stdout.write(self.style.SUCCESS('\nNote: Images are downloaded from Unsplash.'))
+        if options['offline']:
+            self.stdout.write(self.style.SUCCESS('\nNote: Offline mode; images come from the cache or generated placeholders.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nNote: Images are downloaded from Unsplash and cached in --cache-dir.'))
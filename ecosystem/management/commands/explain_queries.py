@@ -0,0 +1,75 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from accounts.models import StudentProgress
+from ecosystem.models import Ecosystem, Animal
+from educational_sessions.models import EducationalSession, SessionComment, SessionEnrollment
+
+User = get_user_model()
+
+# Plan lines that read a table without an index, per vendor
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (\w+)(?!\w| USING)'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+INDEX_USE = {
+    'sqlite': re.compile(r'USING (?:COVERING )?INDEX (\w+)'),
+    'postgresql': re.compile(r'Index (?:Only )?Scan (?:Backward )?using (\w+)|Bitmap Index Scan on (\w+)'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN on the hot queries of the main views and reports whether they use an index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plan', action='store_true', help='Print the full plan of every query')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit with an error when a query scans a table')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in FULL_SCAN:
+            raise CommandError(f'EXPLAIN parsing is not supported on {vendor}.')
+        scans = []
+        for name, queryset in self.hot_queries():
+            plan = queryset.explain()
+            indexes = sorted({index for match in INDEX_USE[vendor].finditer(plan) for index in match.groups() if index})
+            tables = FULL_SCAN[vendor].findall(plan)
+            if tables:
+                scans.append(name)
+                status = self.style.WARNING(f'SCAN {", ".join(sorted(set(tables)))}')
+            else:
+                status = self.style.SUCCESS('index')
+            self.stdout.write(f'{name:<34} {status}  {", ".join(indexes)}')
+            if options['verbose_plan']:
+                self.stdout.write(plan + '\n')
+        if scans and options['fail_on_scan']:
+            raise CommandError(f'{len(scans)} hot queries scan a table: {", ".join(scans)}')
+
+    def hot_queries(self):
+        """The queries the list, detail and dashboard views issue, with sample arguments"""
+        now = timezone.now()
+        ecosystem_id = Ecosystem.objects.values_list('pk', flat=True).first() or 1
+        session_id = EducationalSession.objects.values_list('pk', flat=True).first() or 1
+        teacher_id = User.objects.filter(role='teacher').values_list('pk', flat=True).first() or 1
+        student_id = User.objects.filter(role='student').values_list('pk', flat=True).first() or 1
+        ecosystems = Ecosystem.objects.for_cards().order_by('-created_at', '-pk')
+        upcoming = EducationalSession.objects.for_cards().filter(scheduled_date__gte=now)
+        teacher_sessions = EducationalSession.objects.filter(teacher_id=teacher_id).with_stats()
+        return [
+            ('ecosystem_list', ecosystems[:10]),
+            ('ecosystem_list region+era', ecosystems.filter(region='amazon', era='present')[:10]),
+            ('ecosystem_list era', ecosystems.filter(era='present')[:10]),
+            ('ecosystem_list species', ecosystems.with_species('extinct')[:10]),
+            ('ecosystem_detail animals', Animal.objects.filter(ecosystem_id=ecosystem_id)),
+            ('session_list', upcoming.order_by('-scheduled_date', '-pk')[:10]),
+            ('home upcoming sessions', upcoming.order_by('scheduled_date')[:3]),
+            ('session_detail enrollments', SessionEnrollment.objects.filter(session_id=session_id).select_related('student')),
+            ('session_detail comments', SessionComment.objects.filter(session_id=session_id).select_related('user')),
+            ('student_dashboard progress', StudentProgress.objects.for_dashboard().filter(student_id=student_id)),
+            ('student_dashboard enrollments', SessionEnrollment.objects.filter(student_id=student_id).select_related('session')),
+            ('teacher_dashboard sessions', teacher_sessions.order_by('-scheduled_date', '-pk')[:13]),
+            ('teacher_dashboard recent', teacher_sessions.order_by('-created_at')[:5]),
+        ]
@@ -0,0 +1,235 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import StudentProgress
+from ecosystem import search
+from ecosystem.models import Ecosystem, Animal
+from educational_sessions.models import EducationalSession, SessionEnrollment
+from virtual_zoo import catalog_cache
+
+User = get_user_model()
+
+WORDS = (
+    'canopy river savanna reef glacier dune marsh grove ridge delta lagoon steppe tundra fjord '
+    'mangrove prairie basin plateau estuary thicket volcanic coastal alpine boreal tropical arid '
+    'humid ancient lush frozen rocky sandy misty verdant rugged sunlit shaded migratory nocturnal'
+).split()
+ANIMAL_NAMES = (
+    'Jaguar Ocelot Tapir Capybara Heron Ibis Gecko Iguana Lynx Marten Otter Beaver Bison Elk '
+    'Caribou Walrus Puffin Condor Falcon Osprey Mantis Beetle Python Viper Tortoise Salamander'
+).split()
+GENERA = 'Panthera Felis Canis Ursus Aquila Falco Python Chelonia Rana Bufo Lynx Bison'.split()
+DIETS = ['Carnivore', 'Herbivore', 'Omnivore', 'Insectivore']
+STATUSES = ['Least Concern', 'Near Threatened', 'Vulnerable', 'Endangered', 'Extinct']
+
+
+class Command(BaseCommand):
+    help = 'Generates large, deterministic volumes of synthetic data for load testing and profiling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--teachers', type=int, default=500)
+        parser.add_argument('--students', type=int, default=20000)
+        parser.add_argument('--ecosystems', type=int, default=10000)
+        parser.add_argument('--animals', type=int, default=500000)
+        parser.add_argument('--sessions', type=int, default=50000)
+        parser.add_argument('--enrollments', type=int, default=1000000)
+        parser.add_argument('--progress', type=int, default=1000000, help='StudentProgress rows, split between ecosystems and sessions')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='load', help='Username prefix of the generated users')
+        parser.add_argument('--clear', action='store_true', help='Delete data generated earlier with the same prefix first')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        prefix = self.prefix = options['prefix']
+
+        if options['clear']:
+            self.clear(prefix)
+        elif User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Users prefixed "{prefix}_" already exist; use --clear or another --prefix.')
+
+        password = make_password('loadtest123')
+        teacher_ids = self.create_users(prefix, 'teacher', options['teachers'], password)
+        student_ids = self.create_users(prefix, 'student', options['students'], password)
+        if not teacher_ids:
+            raise CommandError('At least one teacher is required.')
+
+        ecosystem_ids = self.bulk(Ecosystem, options['ecosystems'], self.make_ecosystem, teacher_ids)
+        self.bulk(Animal, options['animals'], self.make_animal, ecosystem_ids, return_ids=False)
+        session_ids = self.bulk(EducationalSession, options['sessions'], self.make_session, teacher_ids, ecosystem_ids)
+
+        self.create_enrollments(options['enrollments'], session_ids, student_ids)
+        self.create_progress(options['progress'], student_ids, ecosystem_ids, session_ids)
+
+        # bulk_create skips signals, so bring the derived data up to date in one pass each.
+        self.stdout.write('Updating seat counters and the search index...')
+        self.generated_sessions(session_ids).recount_seats()
+        search.rebuild_index()
+        catalog_cache.invalidate(catalog_cache.ECOSYSTEMS)
+        catalog_cache.invalidate(catalog_cache.SESSIONS)
+
+        self.stdout.write(self.style.SUCCESS('\nLoad data generated successfully!'))
+        self.stdout.write(self.style.SUCCESS(f'Login as {prefix}_teacher_0 or {prefix}_student_0 with password loadtest123'))
+
+    def clear(self, prefix):
+        self.stdout.write(f'Deleting data generated with prefix "{prefix}"...')
+        users = User.objects.filter(username__startswith=f'{prefix}_')
+        ecosystems = Ecosystem.objects.filter(created_by__in=users)
+        sessions = EducationalSession.objects.filter(teacher__in=users)
+        # Raw deletes skip the per-row signal handlers, which would otherwise
+        # reindex and recount once per deleted animal or enrollment.
+        with transaction.atomic():
+            for queryset in (
+                StudentProgress.objects.filter(student__in=users),
+                SessionEnrollment.objects.filter(session__in=sessions),
+                SessionEnrollment.objects.filter(student__in=users),
+                Animal.objects.filter(ecosystem__in=ecosystems),
+            ):
+                queryset._raw_delete(queryset.db)
+            sessions.delete()
+            ecosystems.delete()
+            users.delete()
+
+    def bulk(self, model, total, factory, *args, return_ids=True):
+        """bulk_create ``total`` rows built by ``factory`` in batches; returns the new pks"""
+        ids = []
+        created = 0
+        while created < total:
+            size = min(self.batch_size, total - created)
+            objs = [factory(created + i, *args) for i in range(size)]
+            with transaction.atomic():
+                objs = model.objects.bulk_create(objs, batch_size=self.batch_size)
+            if return_ids:
+                ids.extend(obj.pk for obj in objs)
+            created += size
+            self.stdout.write(f'  {model.__name__}: {created}/{total}', ending='\r')
+        self.stdout.write(self.style.SUCCESS(f'Created {total} {model._meta.verbose_name_plural}'))
+        return ids
+
+    def generated_sessions(self, session_ids):
+        # A range, not pk__in: one parameter per session would pass SQLite's
+        # 32766 variable limit at the default scale. Sessions created meanwhile
+        # by someone else may fall in the range, which is harmless for both uses.
+        if not session_ids:
+            return EducationalSession.objects.none()
+        return EducationalSession.objects.filter(pk__gte=min(session_ids), pk__lte=max(session_ids))
+
+    def create_users(self, prefix, role, count, password):
+        def factory(i):
+            return User(username=f'{prefix}_{role}_{i}', email=f'{prefix}_{role}_{i}@example.com', role=role, password=password)
+        return self.bulk(User, count, factory)
+
+    def words(self, count):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(count))
+
+    def make_ecosystem(self, i, teacher_ids):
+        rng = self.rng
+        return Ecosystem(
+            name=f'{self.words(2).title()} {self.prefix}-{i}',  # the prefix keeps names unique across runs
+            description=self.words(rng.randint(30, 80)).capitalize() + '.',
+            location=self.words(2).title(),
+            region=rng.choice(Ecosystem.REGION_CHOICES)[0],
+            era=rng.choice(Ecosystem.ERA_CHOICES)[0],
+            climate=rng.choice(['Tropical', 'Arid', 'Polar', 'Temperate', 'Marine']),
+            temperature_min=rng.randint(-40, 20),
+            temperature_max=rng.randint(21, 50),
+            vegetation=self.words(rng.randint(10, 30)).capitalize() + '.',
+            precipitation=f'{rng.randint(50, 3000)} mm annually',
+            created_by_id=rng.choice(teacher_ids),
+        )
+
+    def make_animal(self, i, ecosystem_ids):
+        rng = self.rng
+        extinct = rng.random() < 0.2
+        return Animal(
+            ecosystem_id=rng.choice(ecosystem_ids),
+            name=f'{rng.choice(WORDS).title()} {rng.choice(ANIMAL_NAMES)} {i}',
+            scientific_name=f'{rng.choice(GENERA)} {rng.choice(WORDS)}{i}',
+            species_type='extinct' if extinct else 'existing',
+            description=self.words(rng.randint(15, 40)).capitalize() + '.',
+            habitat=self.words(2).title(),
+            diet=rng.choice(DIETS),
+            conservation_status='Extinct' if extinct else rng.choice(STATUSES[:-1]),
+        )
+
+    def make_session(self, i, teacher_ids, ecosystem_ids):
+        rng = self.rng
+        return EducationalSession(
+            title=f'{self.words(3).title()} {i}',
+            description=self.words(rng.randint(20, 60)).capitalize() + '.',
+            session_type=rng.choice(EducationalSession.SESSION_TYPES)[0],
+            teacher_id=rng.choice(teacher_ids),
+            ecosystem_id=rng.choice(ecosystem_ids) if ecosystem_ids and rng.random() < 0.8 else None,
+            scheduled_date=self.now + timedelta(days=rng.randint(-180, 180), minutes=rng.randint(0, 1439)),
+            duration_minutes=rng.choice([30, 45, 60, 90, 120]),
+            max_students=rng.randint(20, 100),
+            lesson_content=self.words(rng.randint(20, 50)).capitalize() + '.',
+        )
+
+    def create_enrollments(self, total, session_ids, student_ids):
+        if not (session_ids and student_ids):
+            return
+        capacities = dict(self.generated_sessions(session_ids).values_list('pk', 'max_students'))
+        rows = self.enrollment_rows(total, session_ids, student_ids, capacities)
+        self.bulk_rows(SessionEnrollment, rows, total)
+
+    def enrollment_rows(self, total, session_ids, student_ids, capacities):
+        remaining = total
+        for index, session_id in enumerate(session_ids):
+            sessions_left = len(session_ids) - index
+            want = -(-remaining // sessions_left)  # ceil
+            count = min(want, capacities[session_id], len(student_ids))
+            for student_id in self.rng.sample(student_ids, count):
+                yield SessionEnrollment(session_id=session_id, student_id=student_id, attended=self.rng.random() < 0.5)
+            remaining -= count
+            if remaining <= 0:
+                return
+
+    def create_progress(self, total, student_ids, ecosystem_ids, session_ids):
+        if not student_ids:
+            return
+        rows = self.progress_rows(total, student_ids, ecosystem_ids, session_ids)
+        self.bulk_rows(StudentProgress, rows, total)
+
+    def progress_rows(self, total, student_ids, ecosystem_ids, session_ids):
+        remaining = total
+        for index, student_id in enumerate(student_ids):
+            students_left = len(student_ids) - index
+            want = -(-remaining // students_left)
+            ecosystem_count = min(want // 2 if session_ids else want, len(ecosystem_ids))
+            session_count = min(want - ecosystem_count, len(session_ids))
+            for ecosystem_id in self.rng.sample(ecosystem_ids, ecosystem_count):
+                yield StudentProgress(student_id=student_id, ecosystem_id=ecosystem_id,
+                                      time_spent_minutes=self.rng.randint(0, 120), completed=self.rng.random() < 0.3)
+            for session_id in self.rng.sample(session_ids, session_count):
+                yield StudentProgress(student_id=student_id, session_id=session_id,
+                                      time_spent_minutes=self.rng.randint(0, 120), completed=self.rng.random() < 0.3)
+            remaining -= ecosystem_count + session_count
+            if remaining <= 0:
+                return
+
+    def bulk_rows(self, model, rows, total):
+        """bulk_create rows from a generator in batches, without holding them all in memory"""
+        created = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                created += self.flush(model, batch, created, total)
+                batch = []
+        if batch:
+            created += self.flush(model, batch, created, total)
+        self.stdout.write(self.style.SUCCESS(f'Created {created} {model._meta.verbose_name_plural}'))
+
+    def flush(self, model, batch, created, total):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+        self.stdout.write(f'  {model.__name__}: {created + len(batch)}/{total}', ending='\r')
+        return len(batch)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from ecosystem.models import Ecosystem, Animal
+from ecosystem.images import generate_derivatives
+from educational_sessions.models import EducationalSession
+
+
+class Command(BaseCommand):
+    help = 'Generates responsive image derivatives for existing ecosystem, animal and session images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true', help='Regenerate derivatives that already exist')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (Ecosystem, Animal, EducationalSession):
+            for instance in model.objects.exclude(image='').exclude(image__isnull=True).only('pk', 'image').iterator():
+                total += generate_derivatives(instance.image, overwrite=options['overwrite'])
+        self.stdout.write(self.style.SUCCESS(f'Generated {total} image derivatives.'))
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from ecosystem import importers
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Creates or updates ecosystems or animals from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(importers.IMPORTS))
+        parser.add_argument('path', help='.csv file with a header row, or .jsonl file with one object per line')
+        parser.add_argument('--format', dest='fmt', choices=importers.FORMATS, help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, default=importers.BATCH_SIZE)
+        parser.add_argument('--user', help='Username recorded as the creator of new ecosystems')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named "{options["user"]}".')
+        try:
+            fmt = options['fmt'] or importers.guess_format(options['path'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as handle:
+            result = importers.import_file(options['kind'], handle, fmt, user, max(1, options['batch_size']))
+        for line, error in result.errors:
+            self.stderr.write(f'Line {line}: {error}')
+        style = self.style.WARNING if result.errors else self.style.SUCCESS
+        self.stdout.write(style(f'{options["kind"].capitalize()}: {result}'))
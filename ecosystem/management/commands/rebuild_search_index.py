@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from ecosystem import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the ecosystem full-text search index from scratch'
+
+    def handle(self, *args, **options):
+        if search.backend() is None:
+            self.stdout.write(self.style.WARNING('No full-text search backend for this database; nothing to do.'))
+            return
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
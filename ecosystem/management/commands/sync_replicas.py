@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = ('Copies the primary SQLite database into every replica in REPLICA_DATABASES, '
+            'for trying out the read replicas locally')
+
+    def handle(self, *args, **options):
+        aliases = settings.REPLICA_DATABASES
+        if not aliases:
+            raise CommandError('No replicas are configured; set DATABASE_REPLICAS, e.g. DATABASE_REPLICAS=replica.sqlite3')
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Only SQLite replicas can be copied. For PostgreSQL, set up streaming replication, '
+                'or make a one-off copy with "createdb -T <primary> <replica>".'
+            )
+        primary.ensure_connection()
+        for alias in aliases:
+            name = settings.DATABASES[alias]['NAME']
+            connections[alias].close()
+            target = sqlite3.connect(name)
+            try:
+                # The online backup API copies a consistent snapshot, even while the primary is in use.
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'{alias}: copied the primary into {name}'))
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# The SQL is copied here rather than imported from ecosystem.search, so that
+# later changes to the index do not change what this migration does.
+SEARCH_TABLE = 'ecosystem_search'
+SEARCH_CONFIG = 'english'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "name, description, location, vegetation, animals, tokenize='unicode61')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, location, vegetation, animals) "
+            "SELECT e.id, e.name, e.description, e.location, e.vegetation, "
+            "COALESCE((SELECT group_concat(a.name || ' ' || a.scientific_name, ' ') "
+            "FROM ecosystem_animal a WHERE a.ecosystem_id = e.id), '') "
+            "FROM ecosystem_ecosystem e"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "ecosystem_id bigint PRIMARY KEY REFERENCES ecosystem_ecosystem (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin "
+            f"ON {SEARCH_TABLE} USING GIN (document)"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (ecosystem_id, document) "
+            "SELECT e.id, "
+            "setweight(to_tsvector(%s, e.name), 'A') || "
+            "setweight(to_tsvector(%s, e.description), 'B') || "
+            "setweight(to_tsvector(%s, e.location), 'C') || "
+            "setweight(to_tsvector(%s, e.vegetation), 'D') || "
+            "setweight(to_tsvector(%s, COALESCE((SELECT string_agg(a.name || ' ' || a.scientific_name, ' ') "
+            "FROM ecosystem_animal a WHERE a.ecosystem_id = e.id), '')), 'A') "
+            "FROM ecosystem_ecosystem e",
+            [SEARCH_CONFIG] * 5,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecosystem', '0003_remove_hologram_preview'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecosystem', '0004_ecosystem_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['ecosystem', 'species_type'], name='animal_ecosystem_species_idx'),
+        ),
+    ]
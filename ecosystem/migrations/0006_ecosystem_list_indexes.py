@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecosystem', '0005_animal_ecosystem_species_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['ecosystem', 'name'], name='animal_ecosystem_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ecosystem',
+            index=models.Index(fields=['created_at', 'id'], name='ecosystem_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ecosystem',
+            index=models.Index(fields=['region', 'era', 'created_at', 'id'], name='ecosystem_region_era_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ecosystem',
+            index=models.Index(fields=['era', 'created_at', 'id'], name='ecosystem_era_created_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicates(apps, schema_editor):
+    """Suffix duplicate natural keys with the row id so the constraints can be added"""
+    Ecosystem = apps.get_model('ecosystem', 'Ecosystem')
+    Animal = apps.get_model('ecosystem', 'Animal')
+    names = Ecosystem.objects.values('name').annotate(n=Count('pk')).filter(n__gt=1).values_list('name', flat=True)
+    for ecosystem in Ecosystem.objects.filter(name__in=list(names)).order_by('pk')[1:]:
+        ecosystem.name = f'{ecosystem.name} ({ecosystem.pk})'[:200]
+        ecosystem.save(update_fields=['name'])
+    keys = Animal.objects.values('ecosystem', 'scientific_name').annotate(first=models.Min('pk'), n=Count('pk')).filter(n__gt=1)
+    for key in keys:
+        duplicates = Animal.objects.filter(
+            ecosystem=key['ecosystem'], scientific_name=key['scientific_name'],
+        ).exclude(pk=key['first'])
+        for animal in duplicates:
+            animal.scientific_name = f'{animal.scientific_name} ({animal.pk})'[:200]
+            animal.save(update_fields=['scientific_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecosystem', '0006_ecosystem_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='animal',
+            constraint=models.UniqueConstraint(fields=('ecosystem', 'scientific_name'), name='animal_unique_scientific_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='ecosystem',
+            constraint=models.UniqueConstraint(fields=('name',), name='ecosystem_unique_name'),
+        ),
+    ]
@@ -1,9 +1,40 @@
 from django.db import models
+from django.db.models import Exists, OuterRef
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+class EcosystemQuerySet(models.QuerySet):
+    # Columns rendered by the catalogue cards (ecosystem/_grid.html, home.html)
+    CARD_FIELDS = (
+        'name', 'description', 'location', 'region', 'era', 'climate',
+        'temperature_min', 'temperature_max', 'image', 'created_by', 'created_at',
+    )
+    
+    def for_cards(self):
+        """Only what a card needs; ownership is checked against ``created_by_id``"""
+        return self.only(*self.CARD_FIELDS)
+    
+    def with_creator(self):
+        return self.select_related('created_by')
+    
+    def with_species(self, species_type):
+        """Ecosystems having at least one animal of ``species_type``.
+        
+        A correlated EXISTS stops at the first matching animal and needs no
+        DISTINCT over the ecosystem columns, unlike joining ``animals``.
+        """
+        animals = Animal.objects.filter(ecosystem=OuterRef('pk'), species_type=species_type)
+        return self.filter(Exists(animals))
+
+
+class AnimalQuerySet(models.QuerySet):
+    def with_ecosystem(self):
+        """Animals are always shown with their ecosystem, see ``Animal.__str__``"""
+        return self.select_related('ecosystem')
+
+
 class Ecosystem(models.Model):
     """Ecosystem model for the Virtual Zoo"""
     REGION_CHOICES = [
@@ -43,8 +74,21 @@ class Ecosystem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = EcosystemQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of ecosystem_list on (-created_at, -pk), unfiltered
+            # and with the region and/or era filters.
+            models.Index(fields=['created_at', 'id'], name='ecosystem_created_idx'),
+            models.Index(fields=['region', 'era', 'created_at', 'id'], name='ecosystem_region_era_idx'),
+            models.Index(fields=['era', 'created_at', 'id'], name='ecosystem_era_created_idx'),
+        ]
+        constraints = [
+            # Natural key of the bulk import (ecosystem/importers.py)
+            models.UniqueConstraint(fields=['name'], name='ecosystem_unique_name'),
+        ]
     
     def __str__(self):
         return self.name
@@ -69,8 +113,20 @@ class Animal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AnimalQuerySet.as_manager()
+    
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Serves the species filter's EXISTS probe on the ecosystem list.
+            models.Index(fields=['ecosystem', 'species_type'], name='animal_ecosystem_species_idx'),
+            # ecosystem_detail lists an ecosystem's animals by name
+            models.Index(fields=['ecosystem', 'name'], name='animal_ecosystem_name_idx'),
+        ]
+        constraints = [
+            # Natural key of the bulk import; a species may live in several ecosystems.
+            models.UniqueConstraint(fields=['ecosystem', 'scientific_name'], name='animal_unique_scientific_name'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.ecosystem.name})"
@@ -0,0 +1,172 @@
+"""Full-text search index for ecosystems.
+
+SQLite uses an FTS5 virtual table and PostgreSQL a tsvector column with a GIN
+index. Both live in the ``ecosystem_search`` table created by migration 0004 and
+are kept in sync by the signal handlers in ``ecosystem.signals``. Any other
+database vendor falls back to ``icontains`` lookups.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'ecosystem_search'
+SEARCH_CONFIG = 'english'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def backend():
+    """Return the search backend for the default connection, or None"""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        return connection.vendor
+    return None
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query or '')
+
+
+def build_match(tokens, vendor):
+    """Turn user tokens into a prefix-matching query for the backend"""
+    if vendor == 'sqlite':
+        return ' '.join('"%s"*' % token for token in tokens)
+    return ' & '.join('%s:*' % token for token in tokens)
+
+
+def _document(ecosystem_id):
+    from .models import Ecosystem, Animal
+
+    row = Ecosystem.objects.filter(pk=ecosystem_id).values(
+        'name', 'description', 'location', 'vegetation'
+    ).first()
+    if row is None:
+        return None
+    animals = Animal.objects.filter(ecosystem_id=ecosystem_id).values_list('name', 'scientific_name')
+    row['animals'] = ' '.join(' '.join(pair) for pair in animals)
+    return row
+
+
+def populate_index(connection):
+    """Index every existing ecosystem in one INSERT ... SELECT"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, location, vegetation, animals) "
+                "SELECT e.id, e.name, e.description, e.location, e.vegetation, "
+                "COALESCE((SELECT group_concat(a.name || ' ' || a.scientific_name, ' ') "
+                "FROM ecosystem_animal a WHERE a.ecosystem_id = e.id), '') "
+                "FROM ecosystem_ecosystem e"
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (ecosystem_id, document) "
+                "SELECT e.id, "
+                "setweight(to_tsvector(%s, e.name), 'A') || "
+                "setweight(to_tsvector(%s, e.description), 'B') || "
+                "setweight(to_tsvector(%s, e.location), 'C') || "
+                "setweight(to_tsvector(%s, e.vegetation), 'D') || "
+                "setweight(to_tsvector(%s, COALESCE((SELECT string_agg(a.name || ' ' || a.scientific_name, ' ') "
+                "FROM ecosystem_animal a WHERE a.ecosystem_id = e.id), '')), 'A') "
+                "FROM ecosystem_ecosystem e",
+                [SEARCH_CONFIG] * 5,
+            )
+
+
+def remove_ecosystem(ecosystem_id):
+    vendor = backend()
+    if vendor is None:
+        return
+    column = 'rowid' if vendor == 'sqlite' else 'ecosystem_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {column} = %s", [ecosystem_id])
+
+
+def index_ecosystem(ecosystem_id):
+    """(Re)index one ecosystem together with its animals' names"""
+    vendor = backend()
+    if vendor is None:
+        return
+    document = _document(ecosystem_id)
+    if document is None:
+        remove_ecosystem(ecosystem_id)
+        return
+    values = [document['name'], document['description'], document['location'],
+              document['vegetation'], document['animals']]
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [ecosystem_id])
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, location, vegetation, animals) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [ecosystem_id] + values,
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (ecosystem_id, document) VALUES (%s, "
+                "setweight(to_tsvector(%s, %s), 'A') || "
+                "setweight(to_tsvector(%s, %s), 'B') || "
+                "setweight(to_tsvector(%s, %s), 'C') || "
+                "setweight(to_tsvector(%s, %s), 'D') || "
+                "setweight(to_tsvector(%s, %s), 'A')) "
+                "ON CONFLICT (ecosystem_id) DO UPDATE SET document = EXCLUDED.document",
+                [ecosystem_id,
+                 SEARCH_CONFIG, values[0], SEARCH_CONFIG, values[1], SEARCH_CONFIG, values[2],
+                 SEARCH_CONFIG, values[3], SEARCH_CONFIG, values[4]],
+            )
+
+
+def rebuild_index():
+    """Rebuild the whole index, e.g. after bulk loads that bypass signals"""
+    if backend() is None:
+        return
+    # Plain DML, so it can run inside a transaction, e.g. together with a bulk load.
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        populate_index(connection)
+
+
+def search_ecosystems(queryset, query):
+    """Filter ``queryset`` by ``query`` and order it by relevance"""
+    from .models import Animal
+
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+    vendor = backend()
+    table = queryset.model._meta.db_table
+    if vendor == 'sqlite':
+        match = build_match(tokens, vendor)
+        ids = RawSQL(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match])
+        # bm25() is lower for better matches, so negate it to sort descending.
+        rank = RawSQL(
+            f"SELECT -bm25({SEARCH_TABLE}, 10.0, 2.0, 4.0, 1.0, 8.0) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rowid = {table}.id",
+            [match],
+        )
+    elif vendor == 'postgresql':
+        match = build_match(tokens, vendor)
+        ids = RawSQL(
+            f"SELECT ecosystem_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery(%s, %s)",
+            [SEARCH_CONFIG, match],
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank(document, to_tsquery(%s, %s)) FROM {SEARCH_TABLE} "
+            f"WHERE ecosystem_id = {table}.id",
+            [SEARCH_CONFIG, match],
+        )
+    else:
+        query = ' '.join(tokens)
+        animal_match = Animal.objects.filter(ecosystem=OuterRef('pk')).filter(
+            Q(name__icontains=query) | Q(scientific_name__icontains=query)
+        )
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(location__icontains=query) |
+            Q(vegetation__icontains=query) |
+            Exists(animal_match)
+        )
+    return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by('-search_rank', '-created_at')
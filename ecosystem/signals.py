@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Ecosystem, Animal
+from virtual_zoo import catalog_cache
+from . import images, search
+
+
+@receiver(post_save, sender=Ecosystem)
+def index_ecosystem_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_ecosystem(instance.pk)
+
+
+@receiver(post_delete, sender=Ecosystem)
+def unindex_ecosystem_on_delete(sender, instance, **kwargs):
+    search.remove_ecosystem(instance.pk)
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+def reindex_ecosystem_on_animal_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_ecosystem(instance.ecosystem_id)
+
+
+@receiver(post_save, sender=Ecosystem)
+@receiver(post_delete, sender=Ecosystem)
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+def invalidate_ecosystem_fragments(sender, **kwargs):
+    catalog_cache.invalidate(catalog_cache.ECOSYSTEMS)
+
+
+@receiver(post_save, sender=Ecosystem)
+@receiver(post_save, sender=Animal)
+def generate_image_derivatives(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image:
+        images.generate_for_instance(instance)
@@ -0,0 +1,20 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from ecosystem.images import existing_derivatives
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(field_file, alt='', css_class='', sizes='100vw', loading='lazy'):
+    """Render an <img> with a srcset of the pre-generated derivatives"""
+    if not field_file:
+        return ''
+    variants = existing_derivatives(field_file)
+    if not variants:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="{}">', field_file.url, alt, css_class, loading)
+    srcset = format_html_join(', ', '{1} {0}w', variants)
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+        field_file.url, srcset, sizes, alt, css_class, loading,
+    )
@@ -1,32 +1,26 @@
 from django import template
-import re
+from educational_sessions.video import VIMEO, YOUTUBE, parse_video_url
 
 register = template.Library()
 
 
 @register.filter
 def extract_youtube_id(url):
-    if not url:
-        return None
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=|youtu\.be\/)([a-zA-Z0-9_-]{11})',
-        r'youtube\.com\/embed\/([a-zA-Z0-9_-]{11})',
-        r'youtube\.com\/v\/([a-zA-Z0-9_-]{11})',
-        r'youtube\.com\/.*[?&]v=([a-zA-Z0-9_-]{11})',
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    return None
+    provider, video_id = parse_video_url(url)
+    return video_id if provider == YOUTUBE else None
 
 
 @register.filter
 def extract_vimeo_id(url):
-    if not url:
-        return None
-    pattern = r'vimeo\.com\/(?:video\/)?(\d+)'
-    match = re.search(pattern, url, re.IGNORECASE)
-    if match:
-        return match.group(1)
-    return None
+    provider, video_id = parse_video_url(url)
+    return video_id if provider == VIMEO else None
+
+
+@register.inclusion_tag('educational_sessions/_video_embed.html')
+def video_embed(session):
+    """Player for a session's recording, from the provider and ID parsed on save"""
+    return {
+        'video_url': session.video_url,
+        'provider': session.video_provider,
+        'embed_url': session.video_embed_url,
+    }
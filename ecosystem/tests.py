@@ -1,3 +1,802 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, router
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from PIL import Image, ImageFile
+from django.urls import reverse
+from accounts.progress import progress_buffer
+from .models import Ecosystem, Animal
+from . import images, importers, search
+from .management.commands.benchmark_startup import parse_importtime
+from virtual_zoo import profiling, replicas
+from virtual_zoo.pagination import KeysetPaginator
+from virtual_zoo.testing import forbid_lazy_loads
+
+
+class EcosystemSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.amazon = Ecosystem.objects.create(
+            name='Amazon Rainforest', description='Largest tropical rainforest.',
+            location='South America', region='amazon', climate='Tropical',
+        )
+        cls.sahara = Ecosystem.objects.create(
+            name='Sahara Desert', description='Largest hot desert, home to the fennec.',
+            location='North Africa', region='sahara', climate='Arid',
+        )
+        Animal.objects.create(
+            ecosystem=cls.amazon, name='Jaguar', scientific_name='Panthera onca',
+            description='Big cat.', habitat='Rainforest', diet='Carnivore',
+        )
+
+    def search(self, query):
+        return list(search.search_ecosystems(Ecosystem.objects.all(), query))
+
+    def test_matches_ecosystem_fields_by_prefix(self):
+        self.assertEqual(self.search('rainfor'), [self.amazon])
+        self.assertEqual(self.search('africa'), [self.sahara])
+
+    def test_matches_animal_and_scientific_names(self):
+        self.assertEqual(self.search('jaguar'), [self.amazon])
+        self.assertEqual(self.search('panthera'), [self.amazon])
+
+    def test_ranks_name_matches_first(self):
+        fennec = Ecosystem.objects.create(
+            name='Fennec Dunes', description='Sand.', location='Libya', climate='Arid',
+        )
+        self.assertEqual(self.search('fennec'), [fennec, self.sahara])
+
+    def test_index_follows_animal_and_ecosystem_changes(self):
+        animal = Animal.objects.create(
+            ecosystem=self.sahara, name='Dromedary Camel', scientific_name='Camelus dromedarius',
+            description='Camel.', habitat='Desert', diet='Herbivore',
+        )
+        self.assertEqual(self.search('camelus'), [self.sahara])
+        animal.delete()
+        self.assertEqual(self.search('camelus'), [])
+        self.amazon.delete()
+        self.assertEqual(self.search('jaguar'), [])
+
+    def test_rebuild_inside_a_transaction(self):
+        # TestCase wraps every test in a transaction, as a bulk load would.
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.SEARCH_TABLE}')
+        self.assertEqual(self.search('jaguar'), [])
+        search.rebuild_index()
+        self.assertEqual(self.search('jaguar'), [self.amazon])
+
+    def test_punctuation_only_query_is_ignored(self):
+        self.assertEqual(len(self.search('"*()')), 2)
+
+    def test_list_view_uses_search_parameter(self):
+        response = self.client.get(reverse('ecosystem:list'), {'search': 'onca'})
+        self.assertEqual(list(response.context['page_obj']), [self.amazon])
+
+
+class CatalogFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ecosystem = Ecosystem.objects.create(
+            name='Great Barrier Reef', description='Reef.', location='Pacific', region='coral', climate='Marine',
+        )
+
+    def test_first_page_is_served_from_cache_until_catalog_changes(self):
+        url = reverse('ecosystem:list')
+        self.assertContains(self.client.get(url), 'Great Barrier Reef')
+        # Only the conditional GET validator
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        Ecosystem.objects.create(
+            name='Kelp Forest', description='Kelp.', location='Pacific', region='ocean', climate='Marine',
+        )
+        self.assertContains(self.client.get(url), 'Kelp Forest')
+
+    def test_fragments_vary_on_filters(self):
+        url = reverse('ecosystem:list')
+        self.assertContains(self.client.get(url, {'region': 'coral'}), 'Great Barrier Reef')
+        self.assertNotContains(self.client.get(url, {'region': 'sahara'}), 'Great Barrier Reef')
+
+    def test_home_page_fragments_are_invalidated_by_animal_changes(self):
+        url = reverse('home')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        Animal.objects.create(
+            ecosystem=self.ecosystem, name='Clownfish', scientific_name='Amphiprion ocellaris',
+            description='Fish.', habitat='Anemones', diet='Omnivore',
+        )
+        # Only the featured ecosystems are re-rendered; upcoming sessions stay cached.
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+
+class AsyncCatalogViewTests(TestCase):
+    """The async read-only views through the ASGI handler and the whole middleware stack"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ecosystem = Ecosystem.objects.create(
+            name='Kelp Forest', description='Kelp.', location='Pacific', region='ocean', climate='Marine',
+        )
+        Animal.objects.create(
+            ecosystem=cls.ecosystem, name='Sea Otter', scientific_name='Enhydra lutris',
+            description='Otter.', habitat='Kelp', diet='Carnivore',
+        )
+        cls.student = get_user_model().objects.create_user('student', password='pw', role='student')
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_list_and_detail(self):
+        response = await self.async_client.get(reverse('ecosystem:list'))
+        self.assertContains(response, 'Kelp Forest')
+        response = await self.async_client.get(reverse('ecosystem:detail', args=[self.ecosystem.pk]))
+        self.assertContains(response, 'Sea Otter')
+        self.assertEqual(response.context['animal_count'], 1)
+        response = await self.async_client.get(reverse('ecosystem:detail', args=[self.ecosystem.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_home_for_a_signed_in_student(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse('home'))
+        self.assertContains(response, 'Kelp Forest')
+        self.assertEqual(response.context['user'], self.student)
+
+    def test_profiling_middleware_stays_async(self):
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(profiling.QueryProfilingMiddleware(view)))
+        self.assertFalse(iscoroutinefunction(profiling.QueryProfilingMiddleware(lambda request: HttpResponse())))
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ecosystem = Ecosystem.objects.create(
+            name='Kelp Forest', description='Kelp.', location='Pacific', region='ocean', climate='Marine',
+        )
+        cls.otter = Animal.objects.create(
+            ecosystem=cls.ecosystem, name='Sea Otter', scientific_name='Enhydra lutris',
+            description='Otter.', habitat='Kelp', diet='Carnivore',
+        )
+        cls.student = get_user_model().objects.create_user('student', password='pw', role='student')
+
+    def setUp(self):
+        cache.clear()
+        progress_buffer.drain()
+        self.addCleanup(progress_buffer.drain)
+        self.url = reverse('ecosystem:detail', args=[self.ecosystem.pk])
+
+    def test_not_modified_until_a_child_changes(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        # Only the validator runs; no page queries and no render.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        self.otter.description = 'Otter, holds hands while asleep.'
+        self.otter.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'holds hands')
+        etag = response['ETag']
+        self.otter.delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_validator_varies_on_the_viewer(self):
+        anonymous = self.client.get(self.url)
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=anonymous['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], anonymous['ETag'])
+        # A user's page must not be revalidated by date alone.
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_student_visit_is_counted_on_304(self):
+        self.client.force_login(self.student)
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(progress_buffer.drain(), {(self.student.pk, 'ecosystem', self.ecosystem.pk): 2})
+
+    def test_pending_messages_get_the_full_page(self):
+        self.client.force_login(self.student)
+        url = reverse('ecosystem:list')
+        etag = self.client.get(url)['ETag']
+        # Students may not create ecosystems; they are sent back to the list with an error.
+        self.client.get(reverse('ecosystem:create'))
+        self.assertContains(self.client.get(url, HTTP_IF_NONE_MATCH=etag), 'permission to create')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_list_changes_with_the_catalog(self):
+        url = reverse('ecosystem:list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, {'era': 'present'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        Ecosystem.objects.create(name='Reef', description='Reef.', location='Pacific', climate='Marine')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CatalogApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ecosystems = [
+            Ecosystem.objects.create(
+                name=f'Reef {i}', description='Reef.', location='Pacific', region='coral', climate='Marine',
+                temperature_min='21.50',
+            )
+            for i in range(5)
+        ]
+        for ecosystem in cls.ecosystems:
+            for name in ('Clownfish', 'Anemone'):
+                Animal.objects.create(
+                    ecosystem=ecosystem, name=name, scientific_name=f'{name} {ecosystem.pk}',
+                    description='Fish.', habitat='Reef', diet='Omnivore',
+                )
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        return response, json.loads(response.content)
+
+    def test_sparse_fieldsets_select_only_those_columns(self):
+        url = reverse('api_v1:ecosystem_list')
+        with self.assertNumQueries(2):  # the ETag validator and the page
+            response, body = self.get(url, fields='name,temperature_min', limit=2)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertEqual(body['data'], [
+            {'name': 'Reef 4', 'temperature_min': '21.50'}, {'name': 'Reef 3', 'temperature_min': '21.50'},
+        ])
+        response, body = self.get(url, fields='name,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', body['error'])
+
+    def test_cursor_pagination_walks_the_list(self):
+        url = reverse('api_v1:ecosystem_list')
+        names = []
+        params = {'fields': 'name', 'limit': 2}
+        while True:
+            _, body = self.get(url, **params)
+            names += [row['name'] for row in body['data']]
+            if not body['links']['next']:
+                break
+            params['cursor'] = body['links']['next'].split('cursor=')[1]
+        self.assertEqual(names, [f'Reef {i}' for i in range(4, -1, -1)])
+        self.assertEqual(self.get(url, limit=500)[0].status_code, 400)
+
+    def test_children_are_embedded_with_one_query(self):
+        url = reverse('api_v1:ecosystem_list')
+        with self.assertNumQueries(3):
+            _, body = self.get(url, fields='id', include='animals', **{'fields[animals]': 'name'})
+        self.assertEqual(len(body['data']), 5)
+        self.assertEqual(body['data'][0]['animals'], [{'name': 'Anemone'}, {'name': 'Clownfish'}])
+        self.assertEqual(self.get(url, include='keepers')[0].status_code, 400)
+
+    def test_unknown_child_fields_are_a_json_400(self):
+        for url in (reverse('api_v1:ecosystem_list'), reverse('api_v1:ecosystem_detail', args=[self.ecosystems[0].pk])):
+            response, body = self.get(url, include='animals', **{'fields[animals]': 'bogus'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('bogus', body['error'])
+
+    def test_detail_and_conditional_get(self):
+        ecosystem = self.ecosystems[0]
+        url = reverse('api_v1:ecosystem_detail', args=[ecosystem.pk])
+        response, body = self.get(url, include='animals')
+        self.assertEqual(body['data']['name'], 'Reef 0')
+        self.assertIsNone(body['data']['image'])
+        self.assertEqual(len(body['data']['animals']), 2)
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'include': 'animals'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Animal.objects.filter(ecosystem=ecosystem).first().delete()
+        response = self.client.get(url, {'include': 'animals'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response, body = self.get(reverse('api_v1:ecosystem_detail', args=[0]))
+        self.assertEqual((response.status_code, body), (404, {'error': 'Not found.'}))
+
+    def test_animals_filter_by_ecosystem(self):
+        ecosystem = self.ecosystems[1]
+        _, body = self.get(reverse('api_v1:animal_list'), ecosystem=ecosystem.pk, fields='name,ecosystem_name')
+        self.assertEqual(body['data'], [
+            {'name': 'Clownfish', 'ecosystem_name': 'Reef 1'}, {'name': 'Anemone', 'ecosystem_name': 'Reef 1'},
+        ])
+        self.assertEqual(self.get(reverse('api_v1:animal_list'), ecosystem='reef')[0].status_code, 400)
+
+    def test_read_only(self):
+        self.assertEqual(self.client.post(reverse('api_v1:ecosystem_list')).status_code, 405)
+
+
+class EcosystemQuerySetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.teacher = User.objects.create_user('teacher', password='pw', role='teacher')
+        for i in range(4):
+            creator = User.objects.create_user(f'creator{i}', password='pw', role='teacher')
+            ecosystem = Ecosystem.objects.create(
+                name=f'Reef {i}', description='Reef.', location='Pacific', climate='Marine', created_by=creator,
+            )
+            Animal.objects.create(
+                ecosystem=ecosystem, name=f'Clownfish {i}', scientific_name='Amphiprion ocellaris',
+                description='Fish.', habitat='Anemones', diet='Omnivore',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_grid_does_not_load_creators(self):
+        self.client.force_login(self.teacher)
+        # user, validator, count, page; the session is cached
+        with forbid_lazy_loads(), self.assertNumQueries(4):
+            response = self.client.get(reverse('ecosystem:list'))
+        self.assertEqual(len(response.context['page_obj']), 4)
+
+    def test_home_page_does_not_load_lazily(self):
+        with forbid_lazy_loads():
+            self.client.get(reverse('home'))
+
+    def test_animal_str_with_ecosystem(self):
+        with forbid_lazy_loads():
+            names = [str(animal) for animal in Animal.objects.with_ecosystem()]
+        self.assertIn('Clownfish 0 (Reef 0)', names)
+
+    def test_species_filter_uses_exists_without_duplicates(self):
+        reef = Ecosystem.objects.get(name='Reef 1')
+        Animal.objects.create(
+            ecosystem=reef, name='Megalodon', scientific_name='Otodus megalodon', species_type='extinct',
+            description='Shark.', habitat='Open ocean', diet='Carnivore',
+        )
+        Animal.objects.create(
+            ecosystem=reef, name='Steller sea cow', scientific_name='Hydrodamalis gigas', species_type='extinct',
+            description='Sirenian.', habitat='Kelp', diet='Herbivore',
+        )
+        queryset = Ecosystem.objects.with_species('extinct')
+        self.assertEqual(list(queryset), [reef])
+        sql = str(queryset.query).upper()
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertEqual(len(Ecosystem.objects.with_species('existing')), 4)
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_queries', '--fail-on-scan', stdout=out)
+        self.assertIn('ecosystem_created_idx', out.getvalue())
+        self.assertIn('animal_ecosystem_species_idx', out.getvalue())
+
+    def test_helper_reports_lazy_foreign_keys(self):
+        with self.assertRaisesMessage(AssertionError, 'Animal.ecosystem'):
+            with forbid_lazy_loads():
+                str(Animal.objects.first())
+
+    def test_helper_reports_deferred_columns(self):
+        with self.assertRaisesMessage(AssertionError, 'Ecosystem.vegetation (deferred)'):
+            with forbid_lazy_loads():
+                Ecosystem.objects.for_cards().first().vegetation
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ecosystem.objects.bulk_create(
+            Ecosystem(name=f'Reef {i}', description='Reef.', location='Pacific', climate='Marine') for i in range(20)
+        )
+        # Identical timestamps for half of them, so the pk tie-breaker matters.
+        Ecosystem.objects.filter(name__in=[f'Reef {i}' for i in range(10)]).update(
+            created_at=Ecosystem.objects.order_by('created_at').values('created_at')[:1]
+        )
+
+    def walk(self, paginator):
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once(self):
+        paginator = KeysetPaginator(Ecosystem.objects.all(), 9, ('-created_at', '-pk'))
+        pages = self.walk(paginator)
+        self.assertEqual([len(page) for page in pages], [9, 9, 2])
+        seen = [ecosystem.pk for page in pages for ecosystem in page]
+        self.assertEqual(seen, list(Ecosystem.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)))
+        self.assertFalse(pages[0].has_previous())
+
+    def test_previous_cursor_returns_the_page_before(self):
+        paginator = KeysetPaginator(Ecosystem.objects.all(), 9, ('-created_at', '-pk'))
+        first, second, third = self.walk(paginator)
+        self.assertEqual(list(paginator.get_page(third.previous_cursor)), list(second))
+        back = paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Ecosystem.objects.all(), 9, ('-created_at', '-pk'))
+        for cursor in ('garbage', 'W10', 'WyJuIiwgWzFdXQ'):
+            self.assertEqual(list(paginator.get_page(cursor)), list(paginator.get_page()))
+
+    @override_settings(PAGINATION_COUNT_CAP=15)
+    def test_count_modes(self):
+        queryset = Ecosystem.objects.all()
+        self.assertEqual(KeysetPaginator(queryset, 9, ('-pk',)).get_page().total_label, '')
+        self.assertEqual(KeysetPaginator(queryset, 9, ('-pk',), count='exact').get_page().total_label, '20')
+        self.assertEqual(KeysetPaginator(queryset, 9, ('-pk',), count='estimate').get_page().total_label, '15+')
+        self.assertEqual(KeysetPaginator(queryset.none(), 9, ('-pk',), count='estimate').get_page().total_label, '0')
+
+    def test_list_view_follows_cursor_with_filters(self):
+        url = reverse('ecosystem:list')
+        first = self.client.get(url, {'era': 'present'}).context['page_obj']
+        self.assertContains(self.client.get(url, {'era': 'present'}), f'?cursor={first.next_cursor}&era=present')
+        second = self.client.get(url, {'era': 'present', 'cursor': first.next_cursor}).context['page_obj']
+        self.assertEqual(len(second), 9)
+        self.assertFalse(set(first) & set(second))
+
+    def test_search_results_paginate_by_rank(self):
+        for name, description in (('Reef 3', 'Kelp kelp kelp forest.'), ('Reef 4', 'Kelp forest.')):
+            ecosystem = Ecosystem.objects.get(name=name)
+            ecosystem.description = description
+            ecosystem.save()
+        page = self.client.get(reverse('ecosystem:list'), {'search': 'kelp'}).context['page_obj']
+        self.assertEqual([ecosystem.name for ecosystem in page], ['Reef 3', 'Reef 4'])
+
+
+class EcosystemDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ecosystem = Ecosystem.objects.create(
+            name='Arctic Tundra', description='Cold.', location='Arctic', region='arctic', climate='Polar',
+        )
+
+    def add_animals(self, count, species_type):
+        for i in range(count):
+            Animal.objects.create(
+                ecosystem=self.ecosystem, name=f'{species_type} {i}', scientific_name=f'Species {species_type} {i}',
+                species_type=species_type, description='Animal.', habitat='Tundra', diet='Omnivore',
+            )
+
+    def test_counts_and_filter(self):
+        self.add_animals(2, 'existing')
+        self.add_animals(1, 'extinct')
+        url = reverse('ecosystem:detail', args=[self.ecosystem.pk])
+        response = self.client.get(url, {'species_type': 'extinct'})
+        self.assertEqual(len(response.context['animals']), 1)
+        self.assertEqual(response.context['existing_count'], 2)
+        self.assertEqual(response.context['extinct_count'], 1)
+        self.assertEqual(response.context['animal_count'], 3)
+
+    def test_query_count_does_not_grow_with_animals(self):
+        url = reverse('ecosystem:detail', args=[self.ecosystem.pk])
+        self.add_animals(1, 'existing')
+        # validator, ecosystem, animals
+        with self.assertNumQueries(3):
+            self.client.get(url)
+        self.add_animals(10, 'extinct')
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+
+class CatalogImportTests(TestCase):
+    ECOSYSTEMS_CSV = (
+        'name,description,location,region,era,climate,temperature_min,temperature_max\n'
+        'Coral Triangle,Reefs.,Indonesia,coral,present,Marine,24,30\n'
+        'Mammoth Steppe,Grassland.,Siberia,arctic,quaternary,Polar,,\n'
+        'Nowhere,Broken.,Atlantis,atlantis,present,Marine,cold,\n'
+    )
+
+    def import_csv(self, kind, text, **kwargs):
+        return importers.import_file(kind, StringIO(text), 'csv', **kwargs)
+
+    def test_inserts_then_updates_on_name(self):
+        result = self.import_csv('ecosystems', self.ECOSYSTEMS_CSV, batch_size=2)
+        self.assertEqual((result.created, result.updated), (2, 0))
+        self.assertEqual([line for line, _ in result.errors], [4])
+        self.assertIn('region:', result.errors[0][1])
+        self.assertIn('temperature_min:', result.errors[0][1])
+        steppe = Ecosystem.objects.get(name='Mammoth Steppe')
+        self.assertIsNone(steppe.temperature_min)
+
+        result = self.import_csv('ecosystems', self.ECOSYSTEMS_CSV.replace('Grassland.', 'Tundra grassland.'))
+        self.assertEqual((result.created, result.updated), (0, 2))
+        self.assertEqual(Ecosystem.objects.count(), 2)
+        steppe.refresh_from_db()
+        self.assertEqual(steppe.description, 'Tundra grassland.')
+        self.assertEqual(list(search.search_ecosystems(Ecosystem.objects.all(), 'tundra')), [steppe])
+
+    def test_updates_keep_the_columns_a_file_leaves_out(self):
+        self.import_csv('ecosystems', self.ECOSYSTEMS_CSV)
+        result = self.import_csv('ecosystems', 'name,description,location,climate\nCoral Triangle,Warm reefs.,Indonesia,Marine\n')
+        self.assertEqual((result.created, result.updated), (0, 1))
+        reef = Ecosystem.objects.get(name='Coral Triangle')
+        self.assertEqual((reef.description, reef.region, reef.temperature_max), ('Warm reefs.', 'coral', 30))
+
+    @skipUnless(connection.vendor == 'sqlite', 'the rejecting trigger is written for SQLite')
+    def test_rows_the_database_rejects_do_not_sink_the_batch(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TRIGGER reject_steppe BEFORE INSERT ON ecosystem_ecosystem "
+                "WHEN NEW.name = 'Mammoth Steppe' BEGIN SELECT RAISE(ABORT, 'rejected by the database'); END"
+            )
+        self.addCleanup(connection.cursor().execute, 'DROP TRIGGER IF EXISTS reject_steppe')
+        result = self.import_csv('ecosystems', self.ECOSYSTEMS_CSV)
+        self.assertEqual((result.created, result.updated), (1, 0))
+        self.assertEqual(result.errors[1:], [(3, 'Not saved: rejected by the database')])
+        self.assertEqual(list(Ecosystem.objects.values_list('name', flat=True)), ['Coral Triangle'])
+
+    def test_animals_jsonl_keyed_on_ecosystem_and_scientific_name(self):
+        reef = Ecosystem.objects.create(name='Coral Triangle', description='Reefs.', location='Indonesia', climate='Marine')
+        rows = [
+            {'ecosystem': 'Coral Triangle', 'name': 'Clownfish', 'scientific_name': 'Amphiprion ocellaris',
+             'description': 'Fish.', 'habitat': 'Anemones', 'diet': 'Omnivore'},
+            {'ecosystem': 'Atlantis', 'name': 'Kraken', 'scientific_name': 'Architeuthis',
+             'description': 'Squid.', 'habitat': 'Deep', 'diet': 'Carnivore'},
+            {'ecosystem': 'Coral Triangle', 'name': 'Ocellaris clownfish', 'scientific_name': 'Amphiprion ocellaris',
+             'description': 'Fish.', 'habitat': 'Anemones', 'diet': 'Omnivore', 'colour': 'orange'},
+        ]
+        lines = [json.dumps(row) + '\n' for row in rows] + ['{not json\n']
+        with self.assertNumQueries(9):
+            result = importers.import_file('animals', lines, 'jsonl')
+        self.assertEqual((result.created, result.updated), (1, 0))
+        self.assertEqual([line for line, _ in result.errors], [2, 3, 4])
+        self.assertIn('No ecosystem named "Atlantis"', result.errors[0][1])
+        self.assertIn('Unknown columns: colour', result.errors[1][1])
+
+        rows[0]['name'] = 'Ocellaris clownfish'
+        result = importers.import_file('animals', [json.dumps(rows[0])], 'jsonl')
+        self.assertEqual((result.created, result.updated), (0, 1))
+        self.assertEqual(list(reef.animals.values_list('name', flat=True)), ['Ocellaris clownfish'])
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self.ECOSYSTEMS_CSV)
+        self.addCleanup(os.remove, handle.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_catalog', 'ecosystems', handle.name, stdout=out, stderr=err)
+        self.assertIn('2 created, 0 updated, 1 rejected', out.getvalue())
+        self.assertIn('Line 4: region:', err.getvalue())
+
+    def test_admin_import(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin)
+        changelist = reverse('admin:ecosystem_ecosystem_changelist')
+        self.assertContains(self.client.get(changelist), reverse('admin:ecosystem_ecosystem_import'))
+        upload = SimpleUploadedFile('ecosystems.csv', ('\ufeff' + self.ECOSYSTEMS_CSV).encode())
+        response = self.client.post(reverse('admin:ecosystem_ecosystem_import'), {'file': upload}, follow=True)
+        self.assertRedirects(response, changelist)
+        self.assertContains(response, '2 created, 0 updated, 1 rejected')
+        self.assertContains(response, 'Line 4: region:')
+        self.assertEqual(Ecosystem.objects.filter(created_by=admin).count(), 2)
+
+        upload = SimpleUploadedFile('ecosystems.xlsx', b'PK')
+        response = self.client.post(reverse('admin:ecosystem_ecosystem_import'), {'file': upload})
+        self.assertContains(response, 'expected a .csv or .jsonl file')
+
+
+class StartupBenchmarkTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        output = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:       120 |        120 |   _io',
+            'import time:       300 |        300 |     ecosystem.models',
+            'import time:       200 |        500 |   ecosystem',
+            'import time:      1000 |       1000 | virtual_zoo.settings',
+            'System check identified no issues (0 silenced).',
+        ])
+        self.assertEqual(parse_importtime(output), {
+            'modules': 4, 'total_ms': 1.62, 'packages': {'ecosystem': 0.5, 'virtual_zoo': 1.0},
+        })
+
+
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        # Every test uploads reef.jpg into a fresh media root; forget the widths recorded before.
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root, RESPONSIVE_IMAGE_WIDTHS=(320, 640, 1600))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, width, height):
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'green').save(buffer, 'JPEG')
+        return SimpleUploadedFile('reef.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_derivatives_are_generated_on_save(self):
+        ecosystem = Ecosystem.objects.create(
+            name='Reef', description='Reef.', location='Pacific', climate='Marine', image=self.upload(1200, 800),
+        )
+        widths = [width for width, _ in images.existing_derivatives(ecosystem.image)]
+        self.assertEqual(widths, [320, 640])
+        with ecosystem.image.storage.open(images.derivative_name(ecosystem.image.name, 320)) as handle:
+            self.assertEqual(Image.open(handle).size, (320, 213))
+
+    def test_tag_renders_srcset(self):
+        ecosystem = Ecosystem.objects.create(
+            name='Reef', description='Reef.', location='Pacific', climate='Marine', image=self.upload(800, 600),
+        )
+        html = Template('{% load image_tags %}{% responsive_image ecosystem.image alt=ecosystem.name %}').render(
+            Context({'ecosystem': ecosystem})
+        )
+        self.assertIn('.w320.webp 320w, ', html)
+        self.assertIn('.w640.webp 640w"', html)
+        self.assertIn('alt="Reef"', html)
+
+    def test_saving_a_narrow_image_again_does_not_decode_it(self):
+        # 1600 is wider than the original: it is never written, and must not count as missing.
+        ecosystem = Ecosystem.objects.create(
+            name='Reef', description='Reef.', location='Pacific', climate='Marine', image=self.upload(800, 600),
+        )
+        with mock.patch.object(ImageFile.ImageFile, 'load', autospec=True, side_effect=ImageFile.ImageFile.load) as load:
+            ecosystem.save()
+        self.assertEqual(load.call_count, 0)
+
+    def test_rendering_does_not_stat_the_storage(self):
+        ecosystem = Ecosystem.objects.create(
+            name='Reef', description='Reef.', location='Pacific', climate='Marine', image=self.upload(800, 600),
+        )
+        storage = ecosystem.image.storage
+        with mock.patch.object(storage, 'exists', side_effect=AssertionError('storage was checked')):
+            widths = [width for width, _ in images.existing_derivatives(ecosystem.image)]
+        self.assertEqual(widths, [320, 640])
+        # Once the record is gone, the storage is checked once and the widths recorded again.
+        cache.clear()
+        with mock.patch.object(storage, 'exists', wraps=storage.exists) as exists:
+            images.existing_derivatives(ecosystem.image)
+            images.existing_derivatives(ecosystem.image)
+        self.assertEqual(exists.call_count, 3)
+
+
+@override_settings(REQUEST_PROFILING=True, PROFILING_N_PLUS_ONE_THRESHOLD=3)
+class QueryProfilingTests(TestCase):
+    def setUp(self):
+        profiling.view_metrics.reset()
+        self.addCleanup(profiling.view_metrics.reset)
+        for i in range(4):
+            Ecosystem.objects.create(name=f'Reef {i}', description='Reef.', location='Pacific', climate='Marine')
+
+    def profile(self, view):
+        middleware = profiling.QueryProfilingMiddleware(view)
+        with self.assertLogs('virtual_zoo.profiling', level='INFO') as logs:
+            middleware(RequestFactory().get('/ecosystem/'))
+        return logs.records[0]
+
+    def test_log_directory_is_created_on_first_write(self):
+        log_dir = os.path.join(tempfile.mkdtemp(), 'logs')
+        self.addCleanup(shutil.rmtree, os.path.dirname(log_dir))
+        handler = profiling.LogFileHandler(os.path.join(log_dir, 'requests.jsonl'), delay=True)
+        self.addCleanup(handler.close)
+        self.assertFalse(os.path.exists(log_dir))
+        handler.emit(logging.makeLogRecord({'msg': '{}'}))
+        self.assertTrue(os.path.exists(os.path.join(log_dir, 'requests.jsonl')))
+
+    def test_outer_middleware_queries_are_recorded(self):
+        user = get_user_model().objects.create_user('teacher', password='pw', role='teacher')
+        self.client.force_login(user)
+        cache.clear()  # so that the session and the user are read from the database
+        with self.assertLogs('virtual_zoo.profiling', level='INFO') as logs:
+            self.client.get(reverse('accounts:teacher_dashboard'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['queries'], 5)  # session, user, statistics, recent sessions, session page
+
+    async def test_async_view_queries_are_recorded(self):
+        # The async ORM runs the queries in another thread than the middleware.
+        with self.assertLogs('virtual_zoo.profiling', level='INFO') as logs:
+            await self.async_client.get(reverse('ecosystem:list'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertGreater(entry['queries'], 0)
+        self.assertEqual(entry['databases'], {'default': entry['queries']})
+
+    def test_fingerprint_ignores_literals(self):
+        self.assertEqual(
+            profiling.fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'it''s' AND pk IN (%s, %s, %s)"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND pk IN (...)',
+        )
+
+    def test_repeated_queries_are_flagged(self):
+        def view(request):
+            for pk in Ecosystem.objects.values_list('pk', flat=True):
+                Ecosystem.objects.get(pk=pk)
+            return HttpResponse()
+
+        record = self.profile(view)
+        self.assertEqual(record.levelname, 'WARNING')
+        self.assertIn('"queries": 5', record.getMessage())
+        self.assertIn('"databases": {"default": 5}', record.getMessage())
+        self.assertIn('"count": 4', record.getMessage())
+
+    def test_single_query_is_logged_as_info(self):
+        def view(request):
+            list(Ecosystem.objects.all())
+            return HttpResponse()
+
+        record = self.profile(view)
+        self.assertEqual(record.levelname, 'INFO')
+        self.assertIn('"duplicates": []', record.getMessage())
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('ecosystem:list'))
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code, 404)
+
+        staff = get_user_model().objects.create_user('admin', password='pass', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4')
+        self.assertContains(response, 'virtual_zoo_view_requests_total{view="ecosystem:list"} 1')
+        self.assertContains(response, 'virtual_zoo_view_database_queries_total{view="ecosystem:list",database="default"}')
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def request(self, method='get', cookies=None, write=False):
+        """Where a request reads before and after its view writes, and its response"""
+        seen = []
+
+        def view(request):
+            seen.append(router.db_for_read(Ecosystem))
+            if write:
+                router.db_for_write(Ecosystem)
+            seen.append(router.db_for_read(Ecosystem))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/ecosystem/')
+        request.COOKIES.update(cookies or {})
+        response = replicas.ReplicaMiddleware(view)(request)
+        return seen, response
+
+    def test_safe_requests_read_from_a_replica(self):
+        seen, response = self.request()
+        self.assertEqual(seen, ['replica1', 'replica1'])
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        # Outside a request everything uses the primary.
+        self.assertEqual(router.db_for_read(Ecosystem), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'ecosystem'))
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        seen, response = self.request('post', write=True)
+        self.assertEqual(seen, ['default', 'default'])
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        seen, _ = self.request(cookies={replicas.PIN_COOKIE: cookie.value})
+        self.assertEqual(seen, ['default', 'default'])
+        seen, _ = self.request(cookies={replicas.PIN_COOKIE: str(int(time.time()) - 1)})
+        self.assertEqual(seen, ['replica1', 'replica1'])
+
+    def test_a_get_that_writes_reads_its_own_write(self):
+        seen, response = self.request(write=True)
+        self.assertEqual(seen, ['replica1', 'default'])
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+
+    async def test_async_requests(self):
+        async def view(request):
+            return HttpResponse(router.db_for_read(Ecosystem))
+
+        response = await replicas.ReplicaMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'replica1')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas(self):
+        seen, response = self.request(write=True)
+        self.assertEqual(seen, ['default', 'default'])
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertTrue(router.allow_migrate('default', 'ecosystem'))
 
-# Create your tests here.
@@ -1,78 +1,114 @@
-from django.shortcuts import render, get_object_or_404, redirect
+import asyncio
+
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
 from .models import Ecosystem, Animal
 from .forms import EcosystemForm, AnimalForm
-from accounts.models import StudentProgress
-
-
-def ecosystem_list(request):
-    ecosystems = Ecosystem.objects.all()
+from .search import search_ecosystems
+from accounts.progress import record_view
+from django.conf import settings
+from virtual_zoo import catalog_cache
+from virtual_zoo.asyncviews import alist, aload_user, arender
+from virtual_zoo.conditional import conditional_page
+from virtual_zoo.pagination import KeysetPaginator
+
+
+def _list_sources(request):
+    sources = [(Ecosystem.objects.all(), 'updated_at')]
+    if request.GET.get('search') or request.GET.get('species'):
+        # Both filters match on the animals too.
+        sources.append((Animal.objects.all(), 'updated_at'))
+    return sources
+
+
+@conditional_page(_list_sources)
+async def ecosystem_list(request):
+    ecosystems = Ecosystem.objects.for_cards()
     
     # Filtering
     region_filter = request.GET.get('region')
     era_filter = request.GET.get('era')
     search_query = request.GET.get('search')
     species_filter = request.GET.get('species')
+    ordering = ('-created_at', '-pk')
     
     if region_filter:
         ecosystems = ecosystems.filter(region=region_filter)
     if era_filter:
         ecosystems = ecosystems.filter(era=era_filter)
     if search_query:
-        ecosystems = ecosystems.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(location__icontains=search_query) |
-            Q(vegetation__icontains=search_query)
-        )
+        ecosystems = search_ecosystems(ecosystems, search_query)
+        if 'search_rank' in ecosystems.query.annotations:
+            ordering = ('-search_rank', '-pk')
     if species_filter:
-        # Filter by species type in animals
-        ecosystems = ecosystems.filter(animals__species_type=species_filter).distinct()
+        ecosystems = ecosystems.with_species(species_filter)
     
-    paginator = Paginator(ecosystems, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    await aload_user(request)
+    fragments = await catalog_cache.afragment_context(request, catalog_cache.ECOSYSTEMS)
+    paginator = KeysetPaginator(ecosystems, 9, ordering, count=settings.PAGINATION_COUNT)
+    cursor = request.GET.get('cursor')
+    cache_grid = not (search_query or species_filter or cursor)
+    if cache_grid and await catalog_cache.ahas_fragment(
+        'ecosystem_grid', fragments['ecosystems_version'], fragments['catalog_viewer'], region_filter, era_filter,
+    ):
+        # Lazy so that the cached grid fragment skips the count and page queries
+        page_obj = SimpleLazyObject(lambda: paginator.get_page(cursor))
+    else:
+        page_obj = await paginator.aget_page(cursor)
     
-    return render(request, 'ecosystem/list.html', {
+    return await arender(request, 'ecosystem/list.html', {
         'page_obj': page_obj,
         'region_filter': region_filter,
         'era_filter': era_filter,
         'search_query': search_query,
         'species_filter': species_filter,
+        'cache_grid': cache_grid,
+        **fragments,
     })
 
 
-def ecosystem_detail(request, pk):
-    ecosystem = get_object_or_404(Ecosystem, pk=pk)
-    animals = ecosystem.animals.all()
+def _detail_sources(request, pk):
+    return [(Ecosystem.objects.filter(pk=pk), 'updated_at'), (Animal.objects.filter(ecosystem_id=pk), 'updated_at')]
+
+
+def _record_visit(request, pk):
+    if request.user.is_authenticated and request.user.is_student_user():
+        record_view(request.user, ecosystem=Ecosystem(pk=pk))
+
+
+@conditional_page(_detail_sources, not_modified=_record_visit)
+async def ecosystem_detail(request, pk):
+    await aload_user(request)
+    # The animals are filtered on the pk, so both queries are awaited together; they
+    # still run one after the other, but without blocking the event loop.
+    ecosystem, all_animals = await asyncio.gather(
+        aget_object_or_404(Ecosystem, pk=pk),
+        alist(Animal.objects.filter(ecosystem_id=pk)),
+    )
     
     # Track student visit
-    if request.user.is_authenticated and request.user.is_student_user():
-        progress, created = StudentProgress.objects.get_or_create(
-            student=request.user,
-            ecosystem=ecosystem,
-            defaults={'completed': False}
-        )
-        if not created:
-            progress.time_spent_minutes += 1
-            progress.save()
+    _record_visit(request, pk)
+    
+    # Split the animals by species type in memory
+    existing_species = [animal for animal in all_animals if animal.species_type == 'existing']
+    extinct_species = [animal for animal in all_animals if animal.species_type == 'extinct']
     
     # Filter animals by type if requested
     species_type_filter = request.GET.get('species_type')
+    animals = all_animals
     if species_type_filter:
-        animals = animals.filter(species_type=species_type_filter)
-    
-    existing_species = animals.filter(species_type='existing')
-    extinct_species = animals.filter(species_type='extinct')
+        animals = [animal for animal in all_animals if animal.species_type == species_type_filter]
     
-    return render(request, 'ecosystem/detail.html', {
+    return await arender(request, 'ecosystem/detail.html', {
         'ecosystem': ecosystem,
         'animals': animals,
         'existing_species': existing_species,
         'extinct_species': extinct_species,
+        'existing_count': len(existing_species),
+        'extinct_count': len(extinct_species),
+        'animal_count': len(all_animals),
         'species_type_filter': species_type_filter,
     })
 
@@ -99,7 +135,7 @@ def ecosystem_create(request):
 @login_required
 def ecosystem_update(request, pk):
     ecosystem = get_object_or_404(Ecosystem, pk=pk)
-    if not (request.user.is_admin_user() or request.user == ecosystem.created_by):
+    if not (request.user.is_admin_user() or request.user.pk == ecosystem.created_by_id):
         messages.error(request, 'You do not have permission to edit this ecosystem.')
         return redirect('ecosystem:detail', pk=pk)
     
@@ -117,7 +153,7 @@ def ecosystem_update(request, pk):
 @login_required
 def ecosystem_delete(request, pk):
     ecosystem = get_object_or_404(Ecosystem, pk=pk)
-    if not (request.user.is_admin_user() or request.user == ecosystem.created_by):
+    if not (request.user.is_admin_user() or request.user.pk == ecosystem.created_by_id):
         messages.error(request, 'You do not have permission to delete this ecosystem.')
         return redirect('ecosystem:detail', pk=pk)
     
@@ -150,7 +186,7 @@ def animal_create(request, ecosystem_pk):
 
 @login_required
 def animal_update(request, pk):
-    animal = get_object_or_404(Animal, pk=pk)
+    animal = get_object_or_404(Animal.objects.with_ecosystem(), pk=pk)
     if not (request.user.is_admin_user() or request.user.is_teacher_user()):
         messages.error(request, 'You do not have permission to edit this animal.')
         return redirect('ecosystem:detail', pk=animal.ecosystem.pk)
@@ -168,7 +204,7 @@ def animal_update(request, pk):
 
 @login_required
 def animal_delete(request, pk):
-    animal = get_object_or_404(Animal, pk=pk)
+    animal = get_object_or_404(Animal.objects.with_ecosystem(), pk=pk)
     ecosystem_pk = animal.ecosystem.pk
     if not (request.user.is_admin_user() or request.user.is_teacher_user()):
         messages.error(request, 'You do not have permission to delete this animal.')
@@ -4,17 +4,17 @@ from .models import EducationalSession, SessionEnrollment, SessionResource, Sess
 
 @admin.register(EducationalSession)
 class EducationalSessionAdmin(admin.ModelAdmin):
-    list_display = ['title', 'session_type', 'teacher', 'scheduled_date', 'duration_minutes', 'max_students']
+    list_display = ['title', 'session_type', 'teacher', 'scheduled_date', 'duration_minutes', 'max_students', 'seats_taken']
     list_filter = ['session_type', 'scheduled_date', 'teacher']
     search_fields = ['title', 'description', 'teacher__username']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['seats_taken', 'created_at', 'updated_at']
     date_hierarchy = 'scheduled_date'
     fieldsets = (
         ('Basic Information', {
             'fields': ('title', 'description', 'session_type', 'teacher', 'ecosystem')
         }),
         ('Schedule', {
-            'fields': ('scheduled_date', 'duration_minutes', 'max_students')
+            'fields': ('scheduled_date', 'duration_minutes', 'max_students', 'seats_taken')
         }),
         ('Content', {
             'fields': ('video_url', 'lesson_content', 'image')
@@ -30,6 +30,7 @@ class SessionResourceAdmin(admin.ModelAdmin):
     list_display = ['title', 'session', 'uploaded_at']
     list_filter = ['uploaded_at']
     search_fields = ['title', 'session__title', 'description']
+    list_select_related = ['session__teacher']
 
 
 @admin.register(SessionComment)
@@ -37,6 +38,7 @@ class SessionCommentAdmin(admin.ModelAdmin):
     list_display = ['user', 'session', 'created_at']
     list_filter = ['created_at']
     search_fields = ['content', 'user__username', 'session__title']
+    list_select_related = ['user', 'session__teacher']
     readonly_fields = ['created_at', 'updated_at']
 
 
@@ -45,6 +47,7 @@ class SessionQuizAdmin(admin.ModelAdmin):
     list_display = ['question', 'session', 'correct_answer', 'created_at']
     list_filter = ['created_at']
     search_fields = ['question', 'session__title']
+    list_select_related = ['session__teacher']
 
 
 @admin.register(SessionEnrollment)
@@ -52,4 +55,5 @@ class SessionEnrollmentAdmin(admin.ModelAdmin):
     list_display = ['session', 'student', 'enrolled_at', 'attended']
     list_filter = ['attended', 'enrolled_at']
     search_fields = ['session__title', 'student__username']
+    list_select_related = ['student', 'session__teacher']
     readonly_fields = ['enrolled_at']
@@ -0,0 +1,52 @@
+"""Educational sessions in the JSON API (see ``virtual_zoo.api``)"""
+from django.utils import timezone
+from virtual_zoo import api
+from .models import EducationalSession, SessionResource
+
+
+def _upcoming(queryset, value):
+    if value not in ('1', 'true'):
+        raise ValueError(value)
+    return queryset.filter(scheduled_date__gte=timezone.now())
+
+
+SESSIONS = api.Resource(
+    EducationalSession.objects.all,
+    fields={
+        'id': 'pk',
+        'title': 'title',
+        'description': 'description',
+        'session_type': 'session_type',
+        'teacher': 'teacher__username',
+        'ecosystem': 'ecosystem',
+        'scheduled_date': 'scheduled_date',
+        'duration_minutes': 'duration_minutes',
+        'max_students': 'max_students',
+        'seats_taken': 'seats_taken',
+        'image': 'image',
+        'video_url': 'video_url',
+        'lesson_content': 'lesson_content',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+    # The lesson notes can be long; ask for them with ?fields=
+    default_fields=(
+        'id', 'title', 'description', 'session_type', 'teacher', 'ecosystem', 'scheduled_date',
+        'duration_minutes', 'max_students', 'seats_taken', 'image', 'video_url',
+    ),
+    ordering=('-scheduled_date', '-pk'),
+    timestamp='updated_at',
+    filters={'upcoming': _upcoming, 'session_type': 'session_type', 'ecosystem': 'ecosystem'},
+    children={
+        'resources': api.Child(SessionResource, 'session', {
+            'id': 'pk',
+            'title': 'title',
+            'description': 'description',
+            'file': 'file',
+            'uploaded_at': 'uploaded_at',
+        }, 'uploaded_at', ordering=('-uploaded_at', 'pk')),
+    },
+)
+
+session_list = api.list_view(SESSIONS)
+session_detail = api.detail_view(SESSIONS)
@@ -0,0 +1,113 @@
+"""Streaming CSV and JSON Lines exports of enrollments, progress and quizzes.
+
+Rows are read with ``values_list`` and ``iterator(chunk_size=...)`` and encoded
+one at a time, so an export holds a single chunk in memory whatever its size.
+The same generators back the export views and ``manage.py export_data``;
+``aexport_rows`` and ``aencode`` are their asynchronous twins, for responses
+served over ASGI, where Django would read a synchronous iterator whole first.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from accounts.models import StudentProgress
+from .models import SessionEnrollment, SessionQuiz
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _enrollments(user):
+    queryset = SessionEnrollment.objects.all()
+    if user is not None and not user.is_admin_user():
+        queryset = queryset.filter(session__teacher=user)
+    return queryset
+
+
+def _progress(user):
+    queryset = StudentProgress.objects.all()
+    if user is not None and not user.is_admin_user():
+        queryset = queryset.filter(Q(session__teacher=user) | Q(ecosystem__created_by=user))
+    return queryset
+
+
+def _quizzes(user):
+    queryset = SessionQuiz.objects.all()
+    if user is not None and not user.is_admin_user():
+        queryset = queryset.filter(session__teacher=user)
+    return queryset
+
+
+# name -> (rows visible to a user, or to everyone for None; exported columns)
+EXPORTS = {
+    'enrollments': (_enrollments, (
+        'id', 'session_id', 'session__title', 'student_id', 'student__username', 'enrolled_at', 'attended',
+    )),
+    'progress': (_progress, (
+        'id', 'student_id', 'student__username', 'ecosystem_id', 'ecosystem__name', 'session_id',
+        'session__title', 'visited_at', 'time_spent_minutes', 'completed',
+    )),
+    'quizzes': (_quizzes, (
+        'id', 'session_id', 'session__title', 'question', 'option_a', 'option_b', 'option_c', 'option_d',
+        'correct_answer', 'explanation', 'created_at',
+    )),
+}
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_rows(name, user=None):
+    """Yield the header and then one tuple per row of export ``name``"""
+    scope, columns = EXPORTS[name]
+    yield columns
+    # Ordering by pk keeps the output stable and lets the database walk the primary key.
+    yield from scope(user).order_by('pk').values_list(*columns).iterator(chunk_size=chunk_size())
+
+
+async def aexport_rows(name, user=None):
+    """Async version of ``export_rows``"""
+    scope, columns = EXPORTS[name]
+    yield columns
+    # values(), not values_list(): the values_list() iterable runs its query as
+    # soon as aiterator() creates it, which is not allowed on the event loop.
+    async for row in scope(user).order_by('pk').values(*columns).aiterator(chunk_size=chunk_size()):
+        yield tuple(row[column] for column in columns)
+
+
+class _Echo:
+    """File-like object whose write() hands back the line, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _row_encoder(fmt, columns):
+    if fmt == 'csv':
+        return csv.writer(_Echo()).writerow
+    return lambda row: json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def encode(rows, fmt):
+    """Encode the tuples from ``export_rows`` as CSV or JSON Lines, one string per row"""
+    columns = next(rows)
+    encode_row = _row_encoder(fmt, columns)
+    if fmt == 'csv':
+        yield encode_row(columns)
+    for row in rows:
+        yield encode_row(row)
+
+
+async def aencode(rows, fmt):
+    """Async version of ``encode``, for the rows of ``aexport_rows``"""
+    columns = await anext(rows)
+    encode_row = _row_encoder(fmt, columns)
+    if fmt == 'csv':
+        yield encode_row(columns)
+    async for row in rows:
+        yield encode_row(row)
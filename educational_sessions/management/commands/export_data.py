@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from educational_sessions import exports
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Streams enrollments, student progress or quizzes as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', dest='fmt', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write to (default: stdout)')
+        parser.add_argument('--teacher', help='Only export the rows this teacher gets from the web export')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['teacher']:
+            try:
+                user = User.objects.get(username=options['teacher'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named "{options["teacher"]}".')
+
+        lines = exports.encode(exports.export_rows(options['name'], user), options['fmt'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+            handle.writelines(lines)
+        self.stderr.write(self.style.SUCCESS(f'Exported {options["name"]} to {options["output"]}'))
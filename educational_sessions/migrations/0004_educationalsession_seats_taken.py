@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_enrollments(apps, schema_editor):
+    EducationalSession = apps.get_model('educational_sessions', 'EducationalSession')
+    SessionEnrollment = apps.get_model('educational_sessions', 'SessionEnrollment')
+    counts = SessionEnrollment.objects.filter(session=OuterRef('pk')).order_by().values('session').annotate(
+        total=Count('pk')
+    ).values('total')
+    EducationalSession.objects.update(seats_taken=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educational_sessions', '0003_remove_hologram_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='educationalsession',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Denormalized count of enrollments'),
+        ),
+        migrations.RunPython(count_existing_enrollments, migrations.RunPython.noop),
+    ]
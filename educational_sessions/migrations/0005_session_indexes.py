@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educational_sessions', '0004_educationalsession_seats_taken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='educationalsession',
+            index=models.Index(fields=['scheduled_date', 'id'], name='session_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='educationalsession',
+            index=models.Index(fields=['teacher', 'scheduled_date'], name='session_teacher_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessioncomment',
+            index=models.Index(fields=['session', 'created_at'], name='comment_session_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionenrollment',
+            index=models.Index(fields=['student', 'enrolled_at'], name='enrollment_student_idx'),
+        ),
+    ]
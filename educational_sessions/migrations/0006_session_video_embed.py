@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:33
+
+import re
+
+from django.db import migrations, models
+
+# A copy of educational_sessions.video as of this migration, so that later
+# changes to the parser do not change what the migration does.
+PATTERNS = [
+    ('youtube', re.compile(r'(?:youtube\.com/watch\?v=|youtu\.be/)([a-zA-Z0-9_-]{11})', re.IGNORECASE)),
+    ('youtube', re.compile(r'youtube\.com/(?:embed|v|shorts)/([a-zA-Z0-9_-]{11})', re.IGNORECASE)),
+    ('youtube', re.compile(r'youtube\.com/.*[?&]v=([a-zA-Z0-9_-]{11})', re.IGNORECASE)),
+    ('vimeo', re.compile(r'vimeo\.com/(?:video/)?(\d+)', re.IGNORECASE)),
+]
+
+
+def parse_video_url(url):
+    if url:
+        for provider, pattern in PATTERNS:
+            match = pattern.search(url)
+            if match:
+                return provider, match.group(1)
+    return '', ''
+
+
+def parse_existing_video_urls(apps, schema_editor):
+    EducationalSession = apps.get_model('educational_sessions', 'EducationalSession')
+    sessions = []
+    for session in EducationalSession.objects.exclude(video_url__isnull=True).exclude(video_url='').only('video_url').iterator():
+        session.video_provider, session.video_id = parse_video_url(session.video_url)
+        if session.video_id:
+            sessions.append(session)
+    EducationalSession.objects.bulk_update(sessions, ['video_provider', 'video_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educational_sessions', '0005_session_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='educationalsession',
+            name='video_id',
+            field=models.CharField(blank=True, editable=False, help_text='Parsed from video_url on save', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='educationalsession',
+            name='video_provider',
+            field=models.CharField(blank=True, choices=[('youtube', 'YouTube'), ('vimeo', 'Vimeo')], editable=False, max_length=10),
+        ),
+        migrations.RunPython(parse_existing_video_urls, migrations.RunPython.noop),
+    ]
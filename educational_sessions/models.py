@@ -1,10 +1,65 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from .video import PROVIDER_CHOICES, embed_url, parse_video_url
 
 User = get_user_model()
 
 
+def _count_per_session(model, **filters):
+    """Correlated ``COUNT`` of ``model`` rows per session; unlike several joined
+    ``Count()`` annotations, these never multiply each other's rows."""
+    rows = model.objects.filter(session=OuterRef('pk'), **filters).order_by().values('session').annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+class EducationalSessionQuerySet(models.QuerySet):
+    # Columns rendered by the session cards (educational_sessions/_grid.html, home.html)
+    CARD_FIELDS = (
+        'title', 'description', 'session_type', 'scheduled_date', 'duration_minutes',
+        'max_students', 'seats_taken', 'image', 'video_url',
+        'teacher__username', 'teacher__first_name', 'teacher__last_name',
+    )
+    
+    def with_teacher(self):
+        """The teacher is part of every rendering of a session, ``__str__`` included"""
+        return self.select_related('teacher')
+    
+    def for_cards(self):
+        return self.with_teacher().only(*self.CARD_FIELDS)
+    
+    def for_detail(self):
+        return self.select_related('teacher', 'ecosystem')
+    
+    def with_stats(self):
+        """Per-session attendance, quiz and comment counts for the teacher dashboard;
+        enrollments are already counted in ``seats_taken``."""
+        return self.annotate(
+            attended_count=_count_per_session(SessionEnrollment, attended=True),
+            quiz_count=_count_per_session(SessionQuiz),
+            comment_count=_count_per_session(SessionComment),
+        )
+    
+    def adjust_seats(self, delta):
+        """Add ``delta`` to ``seats_taken`` with an F() update, never going below zero.
+        
+        ``updated_at`` moves with it, as the session cards show the seat count
+        (see virtual_zoo.conditional).
+        """
+        sessions = self.filter(seats_taken__gte=-delta) if delta < 0 else self
+        return sessions.update(seats_taken=F('seats_taken') + delta, updated_at=timezone.now())
+    
+    def recount_seats(self):
+        """Set ``seats_taken`` from the enrollments themselves, for bulk loads that
+        skip the signals and to repair a counter that drifted."""
+        return self.update(seats_taken=_count_per_session(SessionEnrollment), updated_at=timezone.now())
+
+
 class EducationalSession(models.Model):
     """Educational session model"""
     SESSION_TYPES = [
@@ -22,17 +77,65 @@ class EducationalSession(models.Model):
     scheduled_date = models.DateTimeField()
     duration_minutes = models.IntegerField(validators=[MinValueValidator(15), MaxValueValidator(180)])
     max_students = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(100)])
+    seats_taken = models.PositiveIntegerField(default=0, editable=False, help_text="Denormalized count of enrollments")
     image = models.ImageField(upload_to='sessions/', blank=True, null=True)
     video_url = models.URLField(blank=True, null=True, help_text="URL to video recording (YouTube, Vimeo, etc.)")
+    video_provider = models.CharField(max_length=10, choices=PROVIDER_CHOICES, blank=True, editable=False)
+    video_id = models.CharField(max_length=32, blank=True, editable=False, help_text="Parsed from video_url on save")
     lesson_content = models.TextField(blank=True, help_text="Additional lesson content/notes")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = EducationalSessionQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-scheduled_date']
+        indexes = [
+            # session_list and the home page: upcoming sessions, keyset on (scheduled_date, pk)
+            models.Index(fields=['scheduled_date', 'id'], name='session_scheduled_idx'),
+            # teacher_dashboard: a teacher's sessions, upcoming ones counted separately
+            models.Index(fields=['teacher', 'scheduled_date'], name='session_teacher_scheduled_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.teacher.username}"
+    
+    def save(self, *args, **kwargs):
+        self.video_provider, self.video_id = parse_video_url(self.video_url)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'video_url' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'video_provider', 'video_id'}
+        super().save(*args, **kwargs)
+    
+    @property
+    def video_embed_url(self):
+        return embed_url(self.video_provider, self.video_id)
+    
+    @property
+    def is_full(self):
+        return self.seats_taken >= self.max_students
+    
+    def enroll(self, student):
+        """Claim a seat and enroll ``student``; returns None when the session is full.
+        
+        The seat is claimed with a conditional UPDATE so concurrent requests can
+        never push ``seats_taken`` past ``max_students``; the UPDATE also locks the
+        session row until the enrollment is committed. Raises IntegrityError if
+        the student is already enrolled, in which case the seat is given back.
+        Enrollments created any other way take their seat in the ``post_save``
+        handler instead.
+        """
+        with transaction.atomic():
+            claimed = EducationalSession.objects.filter(
+                pk=self.pk, seats_taken__lt=F('max_students')
+            ).update(seats_taken=F('seats_taken') + 1, updated_at=timezone.now())
+            if not claimed:
+                return None
+            enrollment = SessionEnrollment(session=self, student=student)
+            enrollment._seat_claimed = True  # tells the post_save handler not to count it again
+            enrollment.save(force_insert=True)
+        self.seats_taken += 1
+        return enrollment
 
 
 class SessionResource(models.Model):
@@ -60,6 +163,9 @@ class SessionComment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['session', 'created_at'], name='comment_session_created_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.user.username} on {self.session.title}"
@@ -96,6 +202,10 @@ class SessionEnrollment(models.Model):
     class Meta:
         unique_together = ['session', 'student']
         ordering = ['-enrolled_at']
+        indexes = [
+            # student_dashboard lists a student's enrollments newest first
+            models.Index(fields=['student', 'enrolled_at'], name='enrollment_student_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.session.title}"
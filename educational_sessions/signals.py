@@ -0,0 +1,63 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from ecosystem import images
+from virtual_zoo import catalog_cache
+from .models import EducationalSession, SessionEnrollment
+
+
+@receiver(post_save, sender=EducationalSession)
+@receiver(post_delete, sender=EducationalSession)
+@receiver(post_save, sender=SessionEnrollment)
+@receiver(post_delete, sender=SessionEnrollment)
+def invalidate_session_fragments(sender, **kwargs):
+    # Enrollments change the seat counts shown on the session cards; the
+    # session's own signal covers those deleted with it.
+    if sender is EducationalSession or not _deleted_with_their_session(kwargs):
+        catalog_cache.invalidate(catalog_cache.SESSIONS)
+
+
+def _deleted_with_their_session(kwargs):
+    """Whether an enrollment's post_delete comes from deleting sessions"""
+    origin = kwargs.get('origin')
+    if isinstance(origin, QuerySet):
+        return origin.model is EducationalSession
+    return isinstance(origin, EducationalSession)
+
+
+@receiver(post_init, sender=SessionEnrollment)
+def remember_enrolled_session(sender, instance, **kwargs):
+    # Read from __dict__ so that a deferred session_id is not loaded.
+    instance._loaded_session_id = instance.__dict__.get('session_id')
+
+
+@receiver(post_save, sender=SessionEnrollment)
+def take_seat(sender, instance, created, raw=False, **kwargs):
+    # Enrollments created or moved by the admin, fixtures or the shell; enroll()
+    # has already claimed its seat.
+    sessions = EducationalSession.objects
+    if raw:
+        # Fixtures carry seats_taken too: count rather than add to it.
+        sessions.filter(pk__in={instance.session_id, instance._loaded_session_id} - {None}).recount_seats()
+    elif created:
+        if not getattr(instance, '_seat_claimed', False):
+            sessions.filter(pk=instance.session_id).adjust_seats(1)
+    elif instance.session_id != instance._loaded_session_id:
+        sessions.filter(pk=instance._loaded_session_id).adjust_seats(-1)
+        sessions.filter(pk=instance.session_id).adjust_seats(1)
+    instance._loaded_session_id = instance.session_id
+
+
+@receiver(post_delete, sender=SessionEnrollment)
+def release_seat(sender, instance, **kwargs):
+    # The unenroll view, admin deletes and the cascade from a deleted student;
+    # a session being deleted needs no counter.
+    if not _deleted_with_their_session(kwargs):
+        session_id = instance._loaded_session_id or instance.session_id
+        EducationalSession.objects.filter(pk=session_id).adjust_seats(-1)
+
+
+@receiver(post_save, sender=EducationalSession)
+def generate_image_derivatives(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image:
+        images.generate_for_instance(instance)
@@ -1,3 +1,328 @@
-from django.test import TestCase
+import importlib
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, close_old_connections, connection
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import StudentProgress, User
+from accounts.progress import progress_buffer
+from virtual_zoo.testing import forbid_lazy_loads
+from .models import EducationalSession, SessionComment, SessionEnrollment, SessionQuiz, SessionResource
+from .video import parse_video_url
+
+
+def make_session(teacher, **kwargs):
+    defaults = {
+        'title': 'Desert Adaptations', 'description': 'Workshop.', 'teacher': teacher,
+        'scheduled_date': timezone.now() + timedelta(days=7), 'duration_minutes': 60, 'max_students': 2,
+    }
+    defaults.update(kwargs)
+    return EducationalSession.objects.create(**defaults)
+
+
+class EnrollmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw', role='teacher')
+        cls.students = [User.objects.create_user(f'student{i}', password='pw', role='student') for i in range(3)]
+        cls.session = make_session(cls.teacher)
+
+    def test_enroll_claims_seats_until_full(self):
+        self.assertIsNotNone(self.session.enroll(self.students[0]))
+        self.assertIsNotNone(self.session.enroll(self.students[1]))
+        self.assertIsNone(self.session.enroll(self.students[2]))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.seats_taken, 2)
+
+    def test_duplicate_enrollment_gives_seat_back(self):
+        self.session.enroll(self.students[0])
+        with self.assertRaises(IntegrityError):
+            self.session.enroll(self.students[0])
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.seats_taken, 1)
+
+    def test_unenroll_view_releases_seat(self):
+        self.session.enroll(self.students[0])
+        self.client.force_login(self.students[0])
+        self.client.post(reverse('educational_sessions:unenroll', args=[self.session.pk]))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.seats_taken, 0)
+        self.assertFalse(SessionEnrollment.objects.exists())
+
+    def test_seat_counter_follows_every_enrollment_change(self):
+        other = make_session(self.teacher, title='Other')
+        enrollment = SessionEnrollment.objects.create(session=self.session, student=self.students[0])
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.seats_taken, 1)
+
+        # Moving an enrollment, as the admin allows, frees the old seat.
+        enrollment = SessionEnrollment.objects.get(pk=enrollment.pk)
+        enrollment.session = other
+        enrollment.save()
+        self.session.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.session.seats_taken, other.seats_taken), (0, 1))
+
+        enrollment.delete()
+        SessionEnrollment.objects.filter(pk=enrollment.pk).delete()
+        other.refresh_from_db()
+        self.assertEqual(other.seats_taken, 0)
+
+    def test_counter_is_adjusted_rather_than_recounted(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.session.enroll(self.students[0])
+        # SAVEPOINT, the seat claim, the INSERT, RELEASE SAVEPOINT
+        self.assertEqual(len(queries), 4)
+        self.assertNotIn('COUNT', ' '.join(q['sql'] for q in queries))
+
+        self.session.enroll(self.students[1])
+        with CaptureQueriesContext(connection) as queries:
+            self.session.delete()
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+
+    def test_enroll_view_reports_full_session(self):
+        self.session.enroll(self.students[0])
+        self.session.enroll(self.students[1])
+        self.client.force_login(self.students[2])
+        response = self.client.post(reverse('educational_sessions:enroll', args=[self.session.pk]))
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)], ['This session is full.'])
+
+
+class SessionQuerySetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [User.objects.create_user(f'student{i}', password='pw', role='student') for i in range(3)]
+        for i in range(3):
+            teacher = User.objects.create_user(f'teacher{i}', password='pw', role='teacher', first_name=f'Ada {i}')
+            cls.session = make_session(teacher, title=f'Session {i}', max_students=10)
+        for student in cls.students:
+            cls.session.enroll(student)
+            SessionComment.objects.create(session=cls.session, user=student, content='Great!')
+
+    def setUp(self):
+        cache.clear()
+        # Student visits are buffered in memory; keep them out of the other tests.
+        self.addCleanup(progress_buffer.drain)
+
+    def test_list_grid_loads_teachers_with_sessions(self):
+        self.client.force_login(self.students[0])
+        with forbid_lazy_loads():
+            response = self.client.get(reverse('educational_sessions:list'))
+        self.assertContains(response, 'teacher2')
+
+    def test_detail_loads_enrollments_and_comments_with_users(self):
+        url = reverse('educational_sessions:detail', args=[self.session.pk])
+        self.client.force_login(self.session.teacher)
+        with forbid_lazy_loads():
+            response = self.client.get(url)
+        self.assertContains(response, 'student2', count=2)
+
+    async def test_detail_under_asgi(self):
+        student = self.students[0]
+        await self.async_client.aforce_login(student)
+        response = await self.async_client.get(reverse('educational_sessions:detail', args=[self.session.pk]))
+        self.assertTrue(response.context['is_enrolled'])
+        self.assertEqual(response.context['enrollment'].student_id, student.pk)
+        self.assertEqual(len(response.context['comments']), 3)
+        response = await self.async_client.get(reverse('educational_sessions:list'))
+        self.assertContains(response, 'Session 2')
+
+    def test_conditional_get_follows_enrollments(self):
+        detail = reverse('educational_sessions:detail', args=[self.session.pk])
+        listing = reverse('educational_sessions:list')
+        self.client.force_login(self.session.teacher)
+        etags = {url: self.client.get(url)['ETag'] for url in (detail, listing)}
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        student = User.objects.create_user('late', password='pw', role='student')
+        enrollment = self.session.enroll(student)
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(detail)['ETag']
+        enrollment.attended = True
+        enrollment.save()
+        self.assertContains(self.client.get(detail, HTTP_IF_NONE_MATCH=etag), 'Attended: Yes')
+
+    def test_str_with_teacher(self):
+        with forbid_lazy_loads():
+            self.assertEqual(str(EducationalSession.objects.with_teacher().get(pk=self.session.pk)), 'Session 2 - teacher2')
+
+
+class SessionApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user('teacher', password='pw', role='teacher')
+        cls.past = make_session(teacher, title='Past', scheduled_date=timezone.now() - timedelta(days=1))
+        cls.upcoming = make_session(teacher, title='Upcoming', lesson_content='Long notes.')
+        SessionResource.objects.create(session=cls.upcoming, title='Slides', file='session_resources/slides.pdf')
+
+    def test_list_filters_and_embeds_resources(self):
+        response = self.client.get(reverse('api_v1:session_list'), {'upcoming': '1', 'include': 'resources'})
+        data = json.loads(response.content)['data']
+        self.assertEqual([row['title'] for row in data], ['Upcoming'])
+        self.assertEqual(data[0]['teacher'], 'teacher')
+        self.assertNotIn('lesson_content', data[0])
+        self.assertEqual(data[0]['resources'][0]['file'], '/media/session_resources/slides.pdf')
+        response = self.client.get(reverse('api_v1:session_list'), {'upcoming': 'maybe'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_fields(self):
+        url = reverse('api_v1:session_detail', args=[self.past.pk])
+        response = self.client.get(url, {'fields': 'title,lesson_content'})
+        self.assertEqual(json.loads(response.content), {'data': {'title': 'Past', 'lesson_content': ''}})
+
+
+class VideoEmbedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw', role='teacher')
+
+    def test_parse_video_url(self):
+        self.assertEqual(parse_video_url('https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=1'), ('youtube', 'dQw4w9WgXcQ'))
+        self.assertEqual(parse_video_url('https://youtu.be/dQw4w9WgXcQ'), ('youtube', 'dQw4w9WgXcQ'))
+        self.assertEqual(parse_video_url('https://www.youtube.com/embed/dQw4w9WgXcQ'), ('youtube', 'dQw4w9WgXcQ'))
+        self.assertEqual(parse_video_url('https://www.youtube.com/playlist?list=x&v=dQw4w9WgXcQ'), ('youtube', 'dQw4w9WgXcQ'))
+        self.assertEqual(parse_video_url('https://vimeo.com/video/76979871'), ('vimeo', '76979871'))
+        self.assertEqual(parse_video_url('https://example.com/talk.mp4'), ('', ''))
+        self.assertEqual(parse_video_url(None), ('', ''))
+
+    def test_video_is_parsed_on_save(self):
+        session = make_session(self.teacher, video_url='https://vimeo.com/76979871')
+        self.assertEqual((session.video_provider, session.video_id), ('vimeo', '76979871'))
+        session.video_url = 'https://youtu.be/dQw4w9WgXcQ'
+        session.save(update_fields=['video_url'])
+        session.refresh_from_db()
+        self.assertEqual(session.video_embed_url, 'https://www.youtube.com/embed/dQw4w9WgXcQ?rel=0&modestbranding=1')
+
+    def test_video_embed_tag(self):
+        template = Template('{% load media_tags %}{% video_embed session %}')
+        youtube = make_session(self.teacher, video_url='https://youtu.be/dQw4w9WgXcQ')
+        html = template.render(Context({'session': youtube}))
+        self.assertIn('src="https://www.youtube.com/embed/dQw4w9WgXcQ?rel=0&amp;modestbranding=1"', html)
+        self.assertNotIn('not recognized', html)
+        other = make_session(self.teacher, video_url='https://example.com/talk.mp4')
+        html = template.render(Context({'session': other}))
+        self.assertIn('href="https://example.com/talk.mp4"', html)
+        self.assertIn('not recognized', html)
+
+    def test_migration_backfills_legacy_rows(self):
+        session = make_session(self.teacher)
+        EducationalSession.objects.filter(pk=session.pk).update(video_url='https://vimeo.com/76979871')
+        migration = importlib.import_module('educational_sessions.migrations.0006_session_video_embed')
+        migration.parse_existing_video_urls(apps, None)
+        session.refresh_from_db()
+        self.assertEqual((session.video_provider, session.video_id), ('vimeo', '76979871'))
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw', role='teacher')
+        cls.other = User.objects.create_user('other', password='pw', role='teacher')
+        cls.student = User.objects.create_user('student', password='pw', role='student')
+        cls.session = make_session(cls.teacher, title='Tide Pools, Part 1')
+        cls.session.enroll(cls.student)
+        make_session(cls.other).enroll(cls.student)
+        StudentProgress.objects.create(student=cls.student, session=cls.session, time_spent_minutes=5)
+        SessionQuiz.objects.create(session=cls.session, question='Q?', option_a='A', option_b='B', correct_answer='B')
+
+    def export(self, name, fmt):
+        response = self.client.get(reverse('educational_sessions:export', args=[name, fmt]))
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_teacher_exports_only_their_sessions(self):
+        self.client.force_login(self.teacher)
+        lines = self.export('enrollments', 'csv').splitlines()
+        self.assertEqual(lines[0], 'id,session_id,session__title,student_id,student__username,enrolled_at,attended')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"Tide Pools, Part 1"', lines[1])
+
+    def test_jsonl_export(self):
+        self.client.force_login(self.teacher)
+        rows = [json.loads(line) for line in self.export('progress', 'jsonl').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['session__title'], 'Tide Pools, Part 1')
+        self.assertEqual(rows[0]['time_spent_minutes'], 5)
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.teacher)
+        response = await self.async_client.get(reverse('educational_sessions:export', args=['progress', 'jsonl']))
+        self.assertTrue(response.is_async)
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['session__title'], 'Tide Pools, Part 1')
+
+    def test_students_cannot_export(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('educational_sessions:export', args=['quizzes', 'csv']))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+    def test_unknown_export_is_404(self):
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.get(reverse('educational_sessions:export', args=['users', 'csv'])).status_code, 404)
+
+    def test_command_exports_everything_by_default(self):
+        out = StringIO()
+        call_command('export_data', 'enrollments', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        out = StringIO()
+        call_command('export_data', 'quizzes', '--format', 'jsonl', '--teacher', 'other', stdout=out)
+        self.assertEqual(out.getvalue(), '')
+
+
+class LegacySessionsModuleTests(SimpleTestCase):
+    def test_sessions_models_forwards_to_educational_sessions(self):
+        legacy = importlib.import_module('sessions.models')
+        with self.assertWarns(DeprecationWarning):
+            self.assertIs(legacy.EducationalSession, EducationalSession)
+        with self.assertWarns(DeprecationWarning):
+            self.assertIs(legacy.SessionEnrollment, SessionEnrollment)
+        with self.assertRaises(AttributeError):
+            legacy.SessionQuiz
+
+
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    def test_concurrent_enrollments_never_overbook(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Threads cannot share an in-memory SQLite database.')
+        teacher = User.objects.create_user('teacher', password='pw', role='teacher')
+        students = [User.objects.create_user(f'student{i}', password='pw', role='student') for i in range(12)]
+        session = make_session(teacher, max_students=5)
+        barrier = threading.Barrier(len(students))
+
+        def enroll(student):
+            try:
+                barrier.wait()
+                for _ in range(50):
+                    try:
+                        EducationalSession(pk=session.pk).enroll(student)
+                        return
+                    except OperationalError:
+                        # SQLite reports lock contention instead of blocking; try again.
+                        continue
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=enroll, args=(student,)) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        close_old_connections()
+
+        session.refresh_from_db()
+        self.assertEqual(session.seats_taken, 5)
+        self.assertEqual(SessionEnrollment.objects.filter(session=session).count(), 5)
@@ -14,5 +14,6 @@ urlpatterns = [
     path('<int:pk>/comment/', views.session_add_comment, name='add_comment'),
     path('<int:pk>/resource/', views.session_add_resource, name='add_resource'),
     path('<int:pk>/quiz/', views.session_add_quiz, name='add_quiz'),
+    path('export/<str:name>.<str:fmt>', views.session_export, name='export'),
 ]
 
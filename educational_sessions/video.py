@@ -0,0 +1,44 @@
+"""Recognise YouTube and Vimeo URLs and build their embed URLs.
+
+Sessions parse ``video_url`` once on save and keep the result in
+``video_provider`` and ``video_id``, so rendering never touches a regex.
+"""
+import re
+from functools import lru_cache
+
+YOUTUBE = 'youtube'
+VIMEO = 'vimeo'
+
+PROVIDER_CHOICES = [
+    (YOUTUBE, 'YouTube'),
+    (VIMEO, 'Vimeo'),
+]
+
+PATTERNS = [
+    (YOUTUBE, re.compile(r'(?:youtube\.com/watch\?v=|youtu\.be/)([a-zA-Z0-9_-]{11})', re.IGNORECASE)),
+    (YOUTUBE, re.compile(r'youtube\.com/(?:embed|v|shorts)/([a-zA-Z0-9_-]{11})', re.IGNORECASE)),
+    (YOUTUBE, re.compile(r'youtube\.com/.*[?&]v=([a-zA-Z0-9_-]{11})', re.IGNORECASE)),
+    (VIMEO, re.compile(r'vimeo\.com/(?:video/)?(\d+)', re.IGNORECASE)),
+]
+
+EMBED_URLS = {
+    YOUTUBE: 'https://www.youtube.com/embed/{}?rel=0&modestbranding=1',
+    VIMEO: 'https://player.vimeo.com/video/{}?title=0&byline=0&portrait=0',
+}
+
+
+@lru_cache(maxsize=1024)
+def parse_video_url(url):
+    """Return ``(provider, video_id)``, or ``('', '')`` for an unrecognised URL"""
+    if url:
+        for provider, pattern in PATTERNS:
+            match = pattern.search(url)
+            if match:
+                return provider, match.group(1)
+    return '', ''
+
+
+def embed_url(provider, video_id):
+    if provider not in EMBED_URLS or not video_id:
+        return ''
+    return EMBED_URLS[provider].format(video_id)
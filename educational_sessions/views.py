@@ -1,54 +1,98 @@
-from django.shortcuts import render, get_object_or_404, redirect
+import asyncio
+
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError
+from django.http import Http404, StreamingHttpResponse
 from django.utils import timezone
-from .models import EducationalSession, SessionEnrollment
+from django.utils.functional import SimpleLazyObject
+from django.conf import settings
+from virtual_zoo import catalog_cache
+from virtual_zoo.asyncviews import alist, aload_user, arender
+from virtual_zoo.conditional import conditional_page
+from virtual_zoo.pagination import KeysetPaginator
+from accounts.progress import record_view
+from .models import EducationalSession, SessionComment, SessionEnrollment, SessionQuiz, SessionResource
 from .forms import EducationalSessionForm
+from . import exports
+
+
+def _list_sources(request):
+    # Sessions drop out of the list once scheduled; the row count catches that.
+    return [(EducationalSession.objects.filter(scheduled_date__gte=timezone.now()), 'updated_at')]
+
+
+@conditional_page(_list_sources)
+async def session_list(request):
+    sessions = EducationalSession.objects.for_cards().filter(scheduled_date__gte=timezone.now())
+    paginator = KeysetPaginator(sessions, 9, ('-scheduled_date', '-pk'), count=settings.PAGINATION_COUNT)
+    cursor = request.GET.get('cursor')
+    await aload_user(request)
+    fragments = await catalog_cache.afragment_context(request, catalog_cache.SESSIONS)
+    if not cursor and await catalog_cache.ahas_fragment(
+        'session_grid', fragments['sessions_version'], fragments['catalog_viewer'],
+    ):
+        # Lazy so that the cached grid fragment skips the count and page queries
+        page_obj = SimpleLazyObject(lambda: paginator.get_page(cursor))
+    else:
+        page_obj = await paginator.aget_page(cursor)
+    return await arender(request, 'educational_sessions/list.html', {
+        'page_obj': page_obj,
+        'cache_grid': not cursor,
+        **fragments,
+    })
+
 
+def _detail_sources(request, pk):
+    return [
+        (EducationalSession.objects.filter(pk=pk), 'updated_at'),
+        (SessionEnrollment.objects.filter(session_id=pk), 'enrolled_at'),
+        # Counted separately so that toggling attendance changes the validator
+        (SessionEnrollment.objects.filter(session_id=pk, attended=True), 'enrolled_at'),
+        (SessionResource.objects.filter(session_id=pk), 'uploaded_at'),
+        (SessionComment.objects.filter(session_id=pk), 'updated_at'),
+        (SessionQuiz.objects.filter(session_id=pk), 'created_at'),
+    ]
 
-def session_list(request):
-    sessions = EducationalSession.objects.filter(scheduled_date__gte=timezone.now())
-    paginator = Paginator(sessions, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return render(request, 'educational_sessions/list.html', {'page_obj': page_obj})
+
+def _record_visit(request, pk):
+    if request.user.is_authenticated and request.user.is_student_user():
+        record_view(request.user, session=EducationalSession(pk=pk))
 
 
-def session_detail(request, pk):
+@conditional_page(_detail_sources, not_modified=_record_visit)
+async def session_detail(request, pk):
     from .forms import SessionCommentForm, SessionResourceForm
-    from accounts.models import StudentProgress
     
-    session = get_object_or_404(EducationalSession, pk=pk)
+    user = await aload_user(request)
+    # Everything below is looked up by the session pk, so the queries are awaited
+    # together; they still run one after the other, but without blocking the event loop.
+    session, enrollments, resources, comments, quizzes = await asyncio.gather(
+        aget_object_or_404(EducationalSession.objects.for_detail(), pk=pk),
+        alist(SessionEnrollment.objects.filter(session_id=pk).select_related('student')),
+        alist(SessionResource.objects.filter(session_id=pk)),
+        alist(SessionComment.objects.filter(session_id=pk).select_related('user')),
+        alist(SessionQuiz.objects.filter(session_id=pk)),
+    )
     is_enrolled = False
     enrollment = None
-    if request.user.is_authenticated and request.user.is_student_user():
-        enrollment = SessionEnrollment.objects.filter(session=session, student=request.user).first()
+    if user.is_authenticated and user.is_student_user():
+        enrollment = next((e for e in enrollments if e.student_id == user.pk), None)
         is_enrolled = enrollment is not None
         
         # Track student viewing
-        progress, created = StudentProgress.objects.get_or_create(
-            student=request.user,
-            session=session,
-            defaults={'completed': False}
-        )
-        if not created:
-            progress.time_spent_minutes += 1
-            progress.save()
-    
-    enrollments = session.enrollments.all()
-    resources = session.resources.all()
-    comments = session.comments.all()
-    quizzes = session.quizzes.all()
-    
-    comment_form = SessionCommentForm() if request.user.is_authenticated else None
-    
-    return render(request, 'educational_sessions/detail.html', {
+        _record_visit(request, pk)
+    
+    comment_form = SessionCommentForm() if user.is_authenticated else None
+    
+    return await arender(request, 'educational_sessions/detail.html', {
         'session': session,
         'is_enrolled': is_enrolled,
         'enrollment': enrollment,
         'enrollments': enrollments,
-        'enrollment_count': enrollments.count(),
+        'enrollment_count': session.seats_taken,
         'resources': resources,
         'comments': comments,
         'quizzes': quizzes,
@@ -81,7 +125,7 @@ def session_create(request):
 @login_required
 def session_update(request, pk):
     session = get_object_or_404(EducationalSession, pk=pk)
-    if not (request.user.is_admin_user() or request.user == session.teacher):
+    if not (request.user.is_admin_user() or request.user.pk == session.teacher_id):
         messages.error(request, 'You do not have permission to edit this session.')
         return redirect('educational_sessions:detail', pk=pk)
     
@@ -99,7 +143,7 @@ def session_update(request, pk):
 @login_required
 def session_delete(request, pk):
     session = get_object_or_404(EducationalSession, pk=pk)
-    if not (request.user.is_admin_user() or request.user == session.teacher):
+    if not (request.user.is_admin_user() or request.user.pk == session.teacher_id):
         messages.error(request, 'You do not have permission to delete this session.')
         return redirect('educational_sessions:detail', pk=pk)
     
@@ -117,15 +161,19 @@ def session_enroll(request, pk):
         messages.error(request, 'Only students can enroll in sessions.')
         return redirect('educational_sessions:detail', pk=pk)
     
-    if SessionEnrollment.objects.filter(session=session, student=request.user).exists():
+    try:
+        enrollment = session.enroll(request.user)
+    except IntegrityError:
         messages.warning(request, 'You are already enrolled in this session.')
         return redirect('educational_sessions:detail', pk=pk)
     
-    if session.enrollments.count() >= session.max_students:
-        messages.error(request, 'This session is full.')
+    if enrollment is None:
+        if SessionEnrollment.objects.filter(session=session, student=request.user).exists():
+            messages.warning(request, 'You are already enrolled in this session.')
+        else:
+            messages.error(request, 'This session is full.')
         return redirect('educational_sessions:detail', pk=pk)
     
-    enrollment = SessionEnrollment.objects.create(session=session, student=request.user)
     messages.success(request, f'Successfully enrolled in {session.title}!')
     return redirect('educational_sessions:detail', pk=pk)
 
@@ -139,6 +187,7 @@ def session_unenroll(request, pk):
         messages.warning(request, 'You are not enrolled in this session.')
         return redirect('educational_sessions:detail', pk=pk)
     
+    # The post_delete handler gives the seat back.
     enrollment.delete()
     messages.success(request, f'Successfully unenrolled from {session.title}.')
     return redirect('educational_sessions:detail', pk=pk)
@@ -165,7 +214,7 @@ def session_add_resource(request, pk):
     from .forms import SessionResourceForm
     
     session = get_object_or_404(EducationalSession, pk=pk)
-    if not (request.user.is_admin_user() or request.user == session.teacher):
+    if not (request.user.is_admin_user() or request.user.pk == session.teacher_id):
         messages.error(request, 'You do not have permission to add resources.')
         return redirect('educational_sessions:detail', pk=pk)
     
@@ -184,7 +233,7 @@ def session_add_quiz(request, pk):
     from .forms import SessionQuizForm
     
     session = get_object_or_404(EducationalSession, pk=pk)
-    if not (request.user.is_admin_user() or request.user == session.teacher):
+    if not (request.user.is_admin_user() or request.user.pk == session.teacher_id):
         messages.error(request, 'You do not have permission to add quizzes.')
         return redirect('educational_sessions:detail', pk=pk)
     
@@ -196,3 +245,22 @@ def session_add_quiz(request, pk):
             quiz.save()
             messages.success(request, 'Quiz question added successfully!')
     return redirect('educational_sessions:detail', pk=pk)
+
+
+@login_required
+def session_export(request, name, fmt):
+    if not (request.user.is_admin_user() or request.user.is_teacher_user()):
+        messages.error(request, 'You do not have permission to export data.')
+        return redirect('home')
+    if name not in exports.EXPORTS or fmt not in exports.FORMATS:
+        raise Http404
+    
+    # Teachers get the rows of their own sessions and ecosystems, admins everything.
+    # Under ASGI the response needs an async iterator, or Django buffers the whole export.
+    if isinstance(request, ASGIRequest):
+        rows = exports.aencode(exports.aexport_rows(name, request.user), fmt)
+    else:
+        rows = exports.encode(exports.export_rows(name, request.user), fmt)
+    response = StreamingHttpResponse(rows, content_type=exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    return response
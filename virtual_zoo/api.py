@@ -0,0 +1,246 @@
+"""Read-only JSON API over the catalog, served under ``/api/v1/``.
+
+Each endpoint is described by a ``Resource``: its queryset, the fields a client
+may ask for and the ``values()`` lookups behind them, its filters, the keyset
+ordering and the children that can be embedded. Rows are read with
+``values()`` and serialized from those dictionaries, never from model
+instances, so a large page costs no more than its columns:
+
+- ``?fields=name,region`` picks the fields; only their columns and the sort
+  key are selected. ``?fields[animals]=name`` does the same for a child.
+- ``?include=animals`` embeds the children of every row on the page, read with
+  one ``IN`` query whatever the page size.
+- ``?limit=`` and ``?cursor=`` page through a list with ``KeysetPaginator``;
+  ``links`` holds the URLs of the next and previous pages.
+- Responses carry an ETag from ``virtual_zoo.conditional`` over the listed rows
+  and the embedded children, so a client revalidating with ``If-None-Match``
+  gets a 304 without the page being read.
+
+Errors are JSON as well: ``{"error": "..."}`` with status 400 or 404.
+"""
+import asyncio
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import FileField
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+from .conditional import conditional_page
+from .pagination import KeysetPaginator
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+    def response(self):
+        return JsonResponse({'error': str(self)}, status=self.status)
+
+
+class Fields:
+    """The fields of ``model`` a client can select: JSON name -> ``values()`` lookup"""
+
+    def __init__(self, model, fields, default_fields=None):
+        self.model = model
+        self.fields = fields
+        self.default_fields = tuple(default_fields or fields)
+        # values() returns the stored name of a file; clients need its URL.
+        self.storages = {}
+        for lookup in fields.values():
+            try:
+                field = model._meta.get_field(lookup)
+            except FieldDoesNotExist:
+                continue
+            if isinstance(field, FileField):
+                self.storages[lookup] = field.storage
+
+    def select(self, value):
+        """The field names listed in ``value`` (comma separated), or the defaults"""
+        if value is None:
+            return list(self.default_fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ApiError(f'Unknown fields: {", ".join(unknown) or "(none given)"}. '
+                           f'Available: {", ".join(self.fields)}.')
+        return names
+
+    def lookups(self, names):
+        return [self.fields[name] for name in names]
+
+    def serialize(self, row, names):
+        data = {}
+        for name in names:
+            lookup = self.fields[name]
+            value = row[lookup]
+            if lookup in self.storages:
+                value = self.storages[lookup].url(value) if value else None
+            data[name] = value
+        return data
+
+
+class Child(Fields):
+    """Rows embedded under each parent with ``?include=<name>``.
+
+    ``parent`` is the foreign key to the parent and ``timestamp`` the field that
+    changes with every edit, for the ETag.
+    """
+
+    def __init__(self, model, parent, fields, timestamp, ordering=('pk',), default_fields=None):
+        super().__init__(model, fields, default_fields)
+        self.parent = parent
+        self.timestamp = timestamp
+        self.ordering = ordering
+
+    def of(self, parents):
+        return self.model.objects.filter(**{f'{self.parent}__in': parents})
+
+    async def fetch(self, ids, names):
+        """``{parent id: [serialized child, ...]}`` for the parents ``ids``, in one query"""
+        rows = self.of(ids).order_by(*self.ordering).values(self.parent, *self.lookups(names))
+        children = {}
+        async for row in rows:
+            children.setdefault(row[self.parent], []).append(self.serialize(row, names))
+        return children
+
+
+class Resource(Fields):
+    """A list endpoint and a detail endpoint over ``queryset()``.
+
+    ``filters`` maps a query parameter to a lookup, or to a callable taking the
+    queryset and the value. ``ordering`` must end with ``pk``, see
+    ``KeysetPaginator``.
+    """
+
+    def __init__(self, queryset, fields, ordering, timestamp, default_fields=None, filters=None, children=None):
+        super().__init__(queryset().model, fields, default_fields)
+        self.queryset = queryset
+        self.ordering = ordering
+        self.timestamp = timestamp
+        self.filters = filters or {}
+        self.children = children or {}
+
+    def filter(self, params):
+        queryset = self.queryset()
+        for param, lookup in self.filters.items():
+            value = params.get(param)
+            if not value:
+                continue
+            try:
+                queryset = lookup(queryset, value) if callable(lookup) else queryset.filter(**{lookup: value})
+            except (ValueError, ValidationError):
+                raise ApiError(f'Invalid value for {param}: "{value}".')
+        return queryset
+
+    def included(self, params):
+        names = [name.strip() for name in params.get('include', '').split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.children]
+        if unknown:
+            raise ApiError(f'Cannot include: {", ".join(unknown)}. Available: {", ".join(self.children) or "none"}.')
+        return names
+
+    def child_fields(self, params, included):
+        """The fields selected for each included child: ``{name: [field, ...]}``"""
+        return {name: self.children[name].select(params.get(f'fields[{name}]')) for name in included}
+
+    def sources(self, queryset, included):
+        """What the ETag of a response listing ``queryset`` covers"""
+        sources = [(queryset, self.timestamp)]
+        for name in included:
+            child = self.children[name]
+            sources.append((child.of(queryset.values('pk')), child.timestamp))
+        return sources
+
+    def columns(self, names):
+        """The ``values()`` of a page: the selected fields, the sort key and the pk"""
+        keys = [name.lstrip('-') for name in self.ordering]
+        return list(dict.fromkeys([*self.lookups(names), *keys, 'pk']))
+
+    async def serialize_rows(self, rows, names, child_fields):
+        data = [self.serialize(row, names) for row in rows]
+        included = list(child_fields)
+        if included:
+            ids = [row['pk'] for row in rows]
+            embedded = await asyncio.gather(*(
+                self.children[name].fetch(ids, child_fields[name]) for name in included
+            ))
+            for name, children in zip(included, embedded):
+                for item, row in zip(data, rows):
+                    item[name] = children.get(row['pk'], [])
+        return data
+
+
+def _limit(params):
+    value = params.get('limit')
+    if value is None:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f'limit must be a number from 1 to {MAX_LIMIT}.')
+    return limit
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def list_view(resource):
+    def sources(request):
+        try:
+            return resource.sources(resource.filter(request.GET), resource.included(request.GET))
+        except ApiError:
+            return [(resource.queryset(), resource.timestamp)]  # the view answers 400
+
+    @require_safe
+    @conditional_page(sources, per_user=False)
+    async def view(request):
+        params = request.GET
+        try:
+            queryset = resource.filter(params)
+            names = resource.select(params.get('fields'))
+            child_fields = resource.child_fields(params, resource.included(params))
+            limit = _limit(params)
+        except ApiError as exc:
+            return exc.response()
+        paginator = KeysetPaginator(queryset.values(*resource.columns(names)), limit, resource.ordering)
+        page = await paginator.aget_page(params.get('cursor'))
+        return JsonResponse({
+            'data': await resource.serialize_rows(page.object_list, names, child_fields),
+            'links': {'next': _link(request, page.next_cursor), 'previous': _link(request, page.previous_cursor)},
+        })
+    return view
+
+
+def detail_view(resource):
+    def sources(request, pk):
+        try:
+            included = resource.included(request.GET)
+        except ApiError:
+            included = []
+        return resource.sources(resource.queryset().filter(pk=pk), included)
+
+    @require_safe
+    @conditional_page(sources, per_user=False)
+    async def view(request, pk):
+        params = request.GET
+        try:
+            names = resource.select(params.get('fields'))
+            child_fields = resource.child_fields(params, resource.included(params))
+        except ApiError as exc:
+            return exc.response()
+        row = await resource.queryset().filter(pk=pk).values(*resource.columns(names)).afirst()
+        if row is None:
+            return ApiError('Not found.', status=404).response()
+        data = await resource.serialize_rows([row], names, child_fields)
+        return JsonResponse({'data': data[0]})
+    return view
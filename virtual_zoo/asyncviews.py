@@ -0,0 +1,27 @@
+"""Helpers for the async read-only views of the catalog.
+
+Those views fetch their data with the async ORM and ``asyncio.gather`` the
+queries that do not depend on each other, so under ASGI the worker serves other
+requests while one waits on the database. The gathered queries do not overlap:
+the async ORM runs them thread-sensitively, one after another on one thread. Templates still render synchronously:
+the context processors load the session and messages and a few templates follow
+relations (``user.progress.count`` on the home page), so ``arender`` runs
+``render`` in the thread the async ORM uses.
+"""
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+
+async def alist(queryset):
+    """Evaluate ``queryset`` without blocking the event loop"""
+    return [obj async for obj in queryset]
+
+
+async def aload_user(request):
+    """Load the user once for the view and the ``auth`` context processor"""
+    request.user = await request.auser()
+    return request.user
+
+
+async def arender(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
@@ -0,0 +1,74 @@
+"""Versioned cache keys for the public catalog fragments.
+
+Rendered fragments of the home page and of the first page of the ecosystem and
+session lists are cached with ``{% cache %}``. Each fragment varies on a
+per-namespace version number which the ``post_save``/``post_delete`` handlers
+bump, so a change to the catalog orphans every stale fragment at once instead of
+deleting keys one by one.
+"""
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+
+ECOSYSTEMS = 'ecosystems'
+SESSIONS = 'sessions'
+
+
+def _version_key(namespace):
+    return f'catalog:{namespace}:version'
+
+
+def catalog_version(namespace):
+    return cache.get_or_set(_version_key(namespace), 1, None)
+
+
+async def acatalog_version(namespace):
+    return await cache.aget_or_set(_version_key(namespace), 1, None)
+
+
+def invalidate(namespace):
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), 1, None)
+
+
+def cache_timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 600)
+
+
+def viewer_key(user):
+    """What the cached fragments vary on for per-user controls (edit/delete links)"""
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_admin_user():
+        return 'admin'
+    return f'user-{user.pk}'
+
+
+def fragment_context(request, *namespaces):
+    context = {
+        'catalog_timeout': cache_timeout(),
+        'catalog_viewer': viewer_key(request.user),
+    }
+    for namespace in namespaces:
+        context[f'{namespace}_version'] = catalog_version(namespace)
+    return context
+
+
+async def afragment_context(request, *namespaces):
+    """``fragment_context`` for async views"""
+    context = {
+        'catalog_timeout': cache_timeout(),
+        'catalog_viewer': viewer_key(await request.auser()),
+    }
+    for namespace in namespaces:
+        context[f'{namespace}_version'] = await acatalog_version(namespace)
+    return context
+
+
+async def ahas_fragment(fragment_name, *vary_on):
+    """Whether ``{% cache timeout fragment_name *vary_on %}`` is cached, so that an
+    async view can skip the queries whose rows only that fragment renders"""
+    fragment_cache = caches['template_fragments' if 'template_fragments' in settings.CACHES else 'default']
+    return await fragment_cache.ahas_key(make_template_fragment_key(fragment_name, vary_on))
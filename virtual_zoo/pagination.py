@@ -0,0 +1,201 @@
+"""Keyset (cursor) pagination for the catalogue lists.
+
+``Paginator`` needs a ``COUNT(*)`` of the whole filtered queryset plus an
+``OFFSET`` query, both of which get slower the deeper the page. Keyset
+pagination instead remembers the sort key of the last row shown and asks for
+the rows after it, e.g. ``WHERE created_at < %s OR (created_at = %s AND id < %s)``,
+which an index on the ordering answers directly at any depth.
+
+Cursors are opaque URL-safe tokens; a malformed one falls back to the first
+page, like ``Paginator.get_page`` does for a bad page number. The ordering must
+end with a unique key (``pk``) and its other fields must not be NULL.
+"""
+import asyncio
+import base64
+import binascii
+import datetime
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from .asyncviews import alist
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder rounds to milliseconds; a cursor must keep the exact value.
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(direction, values):
+    data = json.dumps([direction, values], cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return ``(direction, values)``, or None when ``token`` is not a cursor"""
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, values = json.loads(data)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        return None
+    return direction, values
+
+
+def count_rows(queryset, mode):
+    """Total for the pager: ``(total, label)``, or ``(None, '')`` when ``mode`` is None.
+
+    ``'exact'`` runs a full COUNT. ``'estimate'`` reads the planner's row estimate
+    on PostgreSQL and elsewhere counts at most ``PAGINATION_COUNT_CAP`` rows.
+    """
+    if not mode:
+        return None, ''
+    queryset = queryset.order_by()
+    if mode == 'exact':
+        total = queryset.count()
+        return total, str(total)
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        total = int(plan[0]['Plan']['Plan Rows'])
+        return total, f'~{total}'
+    cap = getattr(settings, 'PAGINATION_COUNT_CAP', 1000)
+    total = queryset[:cap].count()
+    return total, f'{total}+' if total >= cap else str(total)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor, total, total_label):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+        self.total_label = total_label
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` on ``ordering``, e.g. ``('-created_at', '-pk')``.
+
+    ``count`` is None (no total), ``'exact'`` or ``'estimate'``, see ``count_rows``.
+    """
+
+    def __init__(self, queryset, per_page, ordering, count=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.count = count
+
+    def _keys(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _field(self, name):
+        opts = self.queryset.model._meta
+        try:
+            return opts.pk if name == 'pk' else opts.get_field(name)
+        except FieldDoesNotExist:
+            return None  # an annotation such as search_rank
+
+    def _values(self, obj):
+        if isinstance(obj, dict):  # a values() queryset; it must select the ordering
+            return [obj[name] for name, _ in self._keys()]
+        return [getattr(obj, name) for name, _ in self._keys()]
+
+    def _parse(self, values):
+        if len(values) != len(self.ordering):
+            return None
+        parsed = []
+        for (name, _), value in zip(self._keys(), values):
+            field = self._field(name)
+            try:
+                parsed.append(field.to_python(value) if field else value)
+            except ValidationError:
+                return None
+        return parsed
+
+    def _after(self, values, backwards):
+        """Rows strictly after ``values`` in the ordering (before, if ``backwards``)"""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self._keys(), values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def _query(self, cursor):
+        """The rows query for ``cursor``, its decoded sort key and its direction"""
+        decoded = decode_cursor(cursor) if cursor else None
+        values = self._parse(decoded[1]) if decoded else None
+        direction = decoded[0] if values is not None else NEXT
+        backwards = direction == PREVIOUS
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        if backwards:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+        else:
+            ordering = self.ordering
+        return queryset.order_by(*ordering)[:self.per_page + 1], values, backwards
+
+    def _page(self, rows, values, backwards, total, label):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        # Moving forward from a cursor means there is a page before; moving back
+        # means there is one after. ``more`` answers the other side.
+        has_next = more if not backwards else True
+        has_previous = more if backwards else values is not None
+        next_cursor = encode_cursor(NEXT, self._values(rows[-1])) if has_next and rows else None
+        previous_cursor = encode_cursor(PREVIOUS, self._values(rows[0])) if has_previous and rows else None
+        return KeysetPage(rows, next_cursor, previous_cursor, total, label)
+
+    def get_page(self, cursor=None):
+        queryset, values, backwards = self._query(cursor)
+        rows = list(queryset)
+        total, label = count_rows(self.queryset, self.count)
+        return self._page(rows, values, backwards, total, label)
+
+    async def aget_page(self, cursor=None):
+        """``get_page`` for async views; the event loop is not blocked while the rows and the total are read"""
+        queryset, values, backwards = self._query(cursor)
+        rows, (total, label) = await asyncio.gather(
+            alist(queryset), sync_to_async(count_rows)(self.queryset, self.count),
+        )
+        return self._page(rows, values, backwards, total, label)
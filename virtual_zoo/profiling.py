@@ -0,0 +1,226 @@
+"""Per-request SQL and timing instrumentation.
+
+``QueryProfilingMiddleware`` records the wall time of each request and, through
+an ``execute_wrapper`` on every connection, its query count, total SQL time, the queries sent to each database alias (see ``virtual_zoo.replicas``)
+and repeated query fingerprints. Each request is written as one JSON line
+to the ``virtual_zoo.profiling`` logger (a rotating file, see ``LOGGING``), and
+per-view totals are served as plain text by the ``metrics`` view.
+
+A fingerprint repeated ``PROFILING_N_PLUS_ONE_THRESHOLD`` or more times in one
+request is reported as a likely N+1, e.g. one ``accounts_user`` lookup per card.
+
+The recorder of the current request lives in a ContextVar rather than on the
+connections of the thread that handles it: async views run their queries in
+another thread (``sync_to_async``), which the context follows but whose
+connections are its own. ``record_queries`` is added to each connection as it
+is created and does nothing outside a profiled request.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('virtual_zoo.profiling')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:\?|%s),?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+class LogFileHandler(RotatingFileHandler):
+    """Rotating file handler that creates its directory when it first writes,
+    rather than when the settings are imported"""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+def fingerprint(sql):
+    """Normalise a SQL statement so queries differing only in literals compare equal"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper callable collecting timings of every query it sees"""
+
+    def __init__(self):
+        self.count = 0
+        self.sql_time = 0.0
+        self.fingerprints = Counter()
+        self.aliases = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.count += 1
+            self.aliases[context['connection'].alias] += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, threshold):
+        return {sql: count for sql, count in self.fingerprints.items() if count >= threshold}
+
+
+_recorder = ContextVar('query_recorder', default=None)
+
+
+def record_queries(execute, sql, params, many, context):
+    """execute_wrapper handing each query to the recorder of the current request"""
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install(connection, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+connection_created.connect(install, dispatch_uid='virtual_zoo.profiling.install')
+
+
+class ViewMetrics:
+    """Thread-safe running totals per view, rendered for the metrics endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._aliases = {}
+
+    def record(self, view, wall_time, queries, sql_time, n_plus_one, aliases=None):
+        with self._lock:
+            self._aliases.setdefault(view, Counter()).update(aliases or {})
+            totals = self._views.setdefault(view, Counter())
+            totals['requests'] += 1
+            totals['wall_seconds'] += wall_time
+            totals['queries'] += queries
+            totals['sql_seconds'] += sql_time
+            totals['n_plus_one'] += 1 if n_plus_one else 0
+
+    def snapshot(self):
+        with self._lock:
+            return {view: dict(totals) for view, totals in self._views.items()}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._aliases.clear()
+
+    def render(self):
+        lines = []
+        metrics = [
+            ('requests', 'Requests handled', 'counter'),
+            ('wall_seconds', 'Total wall time in seconds', 'counter'),
+            ('queries', 'Total SQL queries', 'counter'),
+            ('sql_seconds', 'Total SQL time in seconds', 'counter'),
+            ('n_plus_one', 'Requests with repeated query fingerprints', 'counter'),
+        ]
+        snapshot = self.snapshot()
+        for key, description, kind in metrics:
+            name = f'virtual_zoo_view_{key}_total'
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for view, totals in sorted(snapshot.items()):
+                value = totals.get(key, 0)
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'{name}{{view="{view}"}} {value}')
+
+        name = 'virtual_zoo_view_database_queries_total'
+        lines.append(f'# HELP {name} SQL queries per database alias')
+        lines.append(f'# TYPE {name} counter')
+        with self._lock:
+            aliases = {view: dict(counts) for view, counts in self._aliases.items()}
+        for view, counts in sorted(aliases.items()):
+            for alias, count in sorted(counts.items()):
+                lines.append(f'{name}{{view="{view}",database="{alias}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+view_metrics = ViewMetrics()
+
+
+class QueryProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Under ASGI stay async so the async views are not run in a thread.
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            return self.get_response(request)
+
+        # Connections opened before this module was imported missed the signal.
+        for alias in connections:
+            install(connections[alias])
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.report(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.report(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def report(self, request, response, recorder, wall_time):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        threshold = getattr(settings, 'PROFILING_N_PLUS_ONE_THRESHOLD', 3)
+        duplicates = recorder.duplicates(threshold)
+        view_metrics.record(view, wall_time, recorder.count, recorder.sql_time, bool(duplicates), recorder.aliases)
+
+        entry = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'wall_ms': round(wall_time * 1000, 2),
+            'queries': recorder.count,
+            'databases': dict(recorder.aliases),
+            'sql_ms': round(recorder.sql_time * 1000, 2),
+            'duplicates': [{'sql': sql, 'count': count} for sql, count in duplicates.items()],
+        }
+        if duplicates:
+            logger.warning(json.dumps(entry))
+        else:
+            logger.info(json.dumps(entry))
@@ -0,0 +1,113 @@
+"""Read replicas with read-your-writes stickiness.
+
+``REPLICA_DATABASES`` lists database aliases that replicate ``default`` (see
+settings). ``ReplicaMiddleware`` picks one of them for each GET or HEAD request
+and ``ReplicaRouter`` sends that request's reads there; every write, every
+other request and everything outside a request (management commands, the
+progress flusher) use the primary.
+
+A replica lags behind, so a client that has just written must not read from
+one: once a request writes, its remaining reads go to the primary and the
+response sets a short-lived ``primary_until`` cookie, pinning that client to the
+primary for ``REPLICA_PIN_SECONDS``. Session saves count as writes, so logging
+in pins too. Test databases mirror ``default`` (``TEST['MIRROR']``).
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'primary_until'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+class RequestRouting:
+    """Where the reads of the current request go; a mutable object so that the
+    writes of ``asyncio.gather``-ed queries are seen by the whole request"""
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.replica is None or routing.wrote:
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same rows.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from the primary.
+        return db not in replica_aliases()
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        routing = self.routing(request)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(response, routing)
+
+    async def __acall__(self, request):
+        routing = self.routing(request)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(response, routing)
+
+    def routing(self, request):
+        aliases = replica_aliases()
+        if not aliases or request.method not in SAFE_METHODS or self.pinned(request):
+            return RequestRouting()
+        return RequestRouting(random.choice(aliases))
+
+    def pinned(self, request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def pin(self, response, routing):
+        if routing.wrote and replica_aliases():
+            seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time()) + seconds), max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,7 +47,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that the queries and time of every other middleware are recorded too
+    'virtual_zoo.profiling.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Before the session middleware, so that session saves pin the client to the primary
+    'virtual_zoo.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,9 +88,75 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file-backed test database lets the concurrency tests open one
+        # connection per thread.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Set POSTGRES_DB (and optionally POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST,
+# POSTGRES_PORT) to run against a local PostgreSQL instead, e.g. for benchmarks.
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', ''),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', ''),
+        'PORT': os.environ.get('POSTGRES_PORT', ''),
+    }
+
+# Read replicas (see virtual_zoo.replicas). Set DATABASE_REPLICAS to a comma
+# separated list of SQLite files, or of PostgreSQL database names when
+# POSTGRES_DB is set; they get the aliases replica1, replica2, ... Locally,
+# "manage.py sync_replicas" copies the primary SQLite file into each replica.
+REPLICA_DATABASES = []
+for number, name in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': name.strip() if os.environ.get('POSTGRES_DB') else BASE_DIR / name.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+DATABASE_ROUTERS = ['virtual_zoo.replicas.ReplicaRouter']
+# How long a client reads from the primary after writing, to see its own writes
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; set VIRTUAL_ZOO_CACHE_DIR to share a file-based
+# cache between worker processes. A shared cache is required for
+# flush_student_progress to reach the workers' buffers (see accounts.progress)
+# and for the cached user snapshots (see AUTHENTICATION_BACKENDS).
+
+if os.environ.get('VIRTUAL_ZOO_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['VIRTUAL_ZOO_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'virtual-zoo',
+        }
+    }
+
+# Lifetime of the cached home page and list fragments (see virtual_zoo.catalog_cache)
+CATALOG_CACHE_TIMEOUT = 600
+
+# Totals shown by the keyset-paginated lists (see virtual_zoo.pagination):
+# None, 'exact' or 'estimate' (planner estimate on PostgreSQL, capped count elsewhere)
+PAGINATION_COUNT = 'estimate'
+PAGINATION_COUNT_CAP = 1000
+
+# Rows fetched per round trip by the streaming CSV/JSONL exports (see educational_sessions.exports)
+EXPORT_CHUNK_SIZE = 2000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,6 +199,11 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized copies of uploaded images served through srcset (see ecosystem.images)
+RESPONSIVE_IMAGE_WIDTHS = (320, 640, 1024)
+RESPONSIVE_IMAGE_FORMAT = 'webp'  # or 'jpeg'
+RESPONSIVE_IMAGE_CACHE_TIMEOUT = 86400  # seconds the generated widths of an image are remembered
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -142,7 +218,45 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+# With a shared cache, request.user is rebuilt from a cached snapshot (see
+# accounts.backends); the snapshots must not live in each worker's own memory.
+# Sessions are read from the cache, falling back to the database on a miss.
+if os.environ.get('VIRTUAL_ZOO_CACHE_DIR'):
+    AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 300  # seconds a user snapshot is trusted
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 # Login URLs
 LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
+
+# Student progress write-behind buffer (see accounts.progress)
+STUDENT_PROGRESS_FLUSH_INTERVAL = 30  # seconds; 0 disables the background flusher
+
+# Per-request SQL and timing instrumentation (see virtual_zoo.profiling)
+REQUEST_PROFILING = DEBUG
+PROFILING_N_PLUS_ONE_THRESHOLD = 3  # repeats of one query fingerprint that flag an N+1
+PROFILING_LOG_DIR = BASE_DIR / 'logs'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'profiling_file': {
+            # Creates PROFILING_LOG_DIR on the first write
+            'class': 'virtual_zoo.profiling.LogFileHandler',
+            'filename': PROFILING_LOG_DIR / 'requests.jsonl',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'virtual_zoo.profiling': {
+            'handlers': ['profiling_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
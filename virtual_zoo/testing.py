@@ -0,0 +1,39 @@
+"""Helpers shared by the app test suites."""
+from contextlib import contextmanager
+
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+from django.db.models.query_utils import DeferredAttribute
+
+
+@contextmanager
+def forbid_lazy_loads():
+    """Fail if a foreign key or a deferred column is fetched lazily inside the block.
+
+    Covers the usual N+1 sources: a relation missing from ``select_related`` and
+    a field left out of an ``only()`` projection. Offending loads raise and are
+    also collected, because ``{% if %}`` silently swallows exceptions from its
+    operands; the block fails on exit either way.
+    """
+    loads = []
+    get_object = ForwardManyToOneDescriptor.get_object
+    get_deferred = DeferredAttribute.__get__
+
+    def forbidden_get_object(descriptor, instance):
+        loads.append(f'{type(instance).__name__}.{descriptor.field.name}')
+        raise AssertionError(f'Lazy load of {loads[-1]}')
+
+    def forbidden_get_deferred(attribute, instance, cls=None):
+        if instance is not None and attribute.field.attname not in instance.__dict__:
+            loads.append(f'{type(instance).__name__}.{attribute.field.attname} (deferred)')
+            raise AssertionError(f'Lazy load of {loads[-1]}')
+        return get_deferred(attribute, instance, cls)
+
+    ForwardManyToOneDescriptor.get_object = forbidden_get_object
+    DeferredAttribute.__get__ = forbidden_get_deferred
+    try:
+        yield loads
+    finally:
+        ForwardManyToOneDescriptor.get_object = get_object
+        DeferredAttribute.__get__ = get_deferred
+    if loads:
+        raise AssertionError('Unexpected lazy loads: ' + ', '.join(sorted(set(loads))))
@@ -18,14 +18,27 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from ecosystem import api as ecosystem_api
+from educational_sessions import api as session_api
 from . import views
 
+api_v1 = [
+    path('ecosystems/', ecosystem_api.ecosystem_list, name='ecosystem_list'),
+    path('ecosystems/<int:pk>/', ecosystem_api.ecosystem_detail, name='ecosystem_detail'),
+    path('animals/', ecosystem_api.animal_list, name='animal_list'),
+    path('animals/<int:pk>/', ecosystem_api.animal_detail, name='animal_detail'),
+    path('sessions/', session_api.session_list, name='session_list'),
+    path('sessions/<int:pk>/', session_api.session_detail, name='session_detail'),
+]
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
+    path('metrics/', views.metrics, name='metrics'),
     path('accounts/', include('accounts.urls')),
     path('ecosystem/', include('ecosystem.urls')),
     path('sessions/', include('educational_sessions.urls')),
+    path('api/v1/', include((api_v1, 'api_v1'))),
     path("__reload__/", include("django_browser_reload.urls")),
 ]
 
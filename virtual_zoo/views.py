@@ -1,17 +1,44 @@
-from django.shortcuts import render
+import asyncio
+
+from django.http import HttpResponse, Http404
+from django.conf import settings
 from ecosystem.models import Ecosystem
 from educational_sessions.models import EducationalSession
 from django.utils import timezone
+from . import catalog_cache
+from .asyncviews import alist, aload_user, arender
+from .profiling import view_metrics
 
 
-def home(request):
-    featured_ecosystems = Ecosystem.objects.all()[:3]
-    upcoming_sessions = EducationalSession.objects.filter(
+async def home(request):
+    featured_ecosystems = Ecosystem.objects.for_cards()[:3]
+    upcoming_sessions = EducationalSession.objects.for_cards().filter(
         scheduled_date__gte=timezone.now()
     ).order_by('scheduled_date')[:3]
     
-    return render(request, 'home.html', {
+    await aload_user(request)
+    fragments = await catalog_cache.afragment_context(request, catalog_cache.ECOSYSTEMS, catalog_cache.SESSIONS)
+    featured_ecosystems, upcoming_sessions = await asyncio.gather(
+        _unless_cached(featured_ecosystems, 'home_featured_ecosystems', fragments['ecosystems_version'], fragments['catalog_viewer']),
+        _unless_cached(upcoming_sessions, 'home_upcoming_sessions', fragments['sessions_version'], fragments['catalog_viewer']),
+    )
+    return await arender(request, 'home.html', {
         'featured_ecosystems': featured_ecosystems,
         'upcoming_sessions': upcoming_sessions,
+        **fragments,
     })
 
+
+async def _unless_cached(queryset, fragment_name, *vary_on):
+    """The rows of ``queryset``, or the queryset unevaluated when its fragment is cached"""
+    if await catalog_cache.ahas_fragment(fragment_name, *vary_on):
+        return queryset
+    return await alist(queryset)
+
+
+def metrics(request):
+    """Per-view request, query and timing totals in a Prometheus-style text format"""
+    internal = request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+    if not (internal or (request.user.is_authenticated and request.user.is_staff)):
+        raise Http404
+    return HttpResponse(view_metrics.render(), content_type='text/plain; version=0.0.4')